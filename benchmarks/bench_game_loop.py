@@ -0,0 +1,248 @@
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+import shutil
+import platform
+from timeit import default_timer
+
+# the benchmarks can be ran from anywhere, so make sure the game can be imported
+# and that pygame doesn't need a display
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+import game
+from input_script import patrol_script
+
+# every case is the amount of platforms, enemies and bullets in the synthetic level
+QUICK_CASES = [
+    (100, 0, 0),
+    (1000, 0, 0),
+    (10000, 0, 0),
+    (1000, 50, 0),
+    (1000, 50, 50)
+]
+
+FULL_CASES = QUICK_CASES + [
+    (50000, 0, 0),
+    (1000, 200, 0),
+    (1000, 200, 200),
+    (50000, 200, 200)
+]
+
+# the parts of a tick that are timed, scrolling happens inside of the player and physics updates
+PHASES = ["bullets", "spawning", "player", "enemies", "physics", "scrolling", "updating", "drawing", "total"]
+
+# how wide the world is for every platform in it, this keeps the amount of
+# platforms on the screen about the same no matter how big the level gets
+WORLD_WIDTH_PER_PLATFORM = 60
+
+# phases that take less time than this (in milliseconds) are too noisy to compare
+NOISE_FLOOR = 0.05
+
+
+# returns a level with the passed in amount of platforms scattered across it and a floor along the bottom
+def make_level(platform_count, seed=0):
+    generator = random.Random(seed)
+    width = max(game.size[0] * 2, platform_count * WORLD_WIDTH_PER_PLATFORM)
+    floor_height = game.Rules.floor_height
+    platforms = [{
+        "type": "FloorPlatform",
+        "x": 0,
+        "y": game.size[1] - floor_height,
+        "width": width,
+        "height": floor_height,
+        "color": [50, 120, 60]
+    }]
+    for i in range(platform_count - 1):
+        platforms.append({
+            "type": "ColumnPlatform",
+            "x": generator.randint(0, width),
+            "y": generator.randint(150, game.size[1] - floor_height - 20),
+            "width": generator.choice([50, 100, 200]),
+            "height": generator.choice([20, 40, 300]),
+            "color": [generator.randint(0, 255), 120, 60]
+        })
+    return {"rules": {"world-size": [width, game.size[1]], "background-color": [139, 103, 255]},
+            "platforms": platforms}
+
+
+# class to add up how long each phase of a tick takes
+class PhaseTimer:
+
+    def __init__(self):
+        self.totals = dict((phase, 0.0) for phase in PHASES)
+        self.worst = dict((phase, 0.0) for phase in PHASES)
+        self.recording = False
+
+    # records how long the phase took in seconds
+    def add(self, phase, seconds):
+        if self.recording:
+            self.totals[phase] += seconds
+            self.worst[phase] = max(self.worst[phase], seconds)
+
+    # returns the passed in function wrapped so that every call to it is timed as the phase
+    def wrap(self, phase, function):
+        def timed(*args):
+            start = default_timer()
+            result = function(*args)
+            self.add(phase, default_timer() - start)
+            return result
+        return timed
+
+    # returns the average and worst milliseconds per tick for every phase
+    def get_results(self, ticks):
+        results = {}
+        for phase in PHASES:
+            results[phase] = {
+                "mean_ms": self.totals[phase] * 1000.0 / ticks,
+                "max_ms": self.worst[phase] * 1000.0
+            }
+        return results
+
+
+# runs the game for the passed in amount of ticks in the passed in synthetic level and
+# returns the time each phase took, the level file is written into the passed in directory
+def run_case(platform_count, enemy_count, bullet_count, ticks, directory):
+    filename = os.path.join(directory, "bench_{}.stg".format(platform_count))
+    if not os.path.exists(filename):
+        with open(filename, "w") as level_file:
+            json.dump(make_level(platform_count), level_file)
+
+    game.reset_groups()
+    spawn_count = game.Rules.spawn_count
+    game.Rules.spawn_count = enemy_count
+
+    try:
+        start_game = game.StartGame(filename, headless=True, seed=0)
+        start_game.surface = pygame.Surface(game.size)
+        groups = game.groups
+        for i in range(enemy_count):
+            groups.enemy_pool.acquire().spawn()
+
+        # time every phase of update_world by wrapping the pieces that it calls
+        timer = PhaseTimer()
+        groups.bullets.update = timer.wrap("bullets", groups.bullets.update)
+        start_game.check_for_bullet_hits = timer.wrap("bullets", start_game.check_for_bullet_hits)
+        start_game.spawn_enemy = timer.wrap("spawning", start_game.spawn_enemy)
+        groups.players.update = timer.wrap("player", groups.players.update)
+        groups.enemies.update = timer.wrap("enemies", groups.enemies.update)
+        start_game.physics.update = timer.wrap("physics", start_game.physics.update)
+        groups.screen.scroll_pieces = timer.wrap("scrolling", groups.screen.scroll_pieces)
+
+        # the first tenth of the ticks let the level settle (and the caches fill up) before timing
+        warm_up = ticks // 10
+        script = patrol_script(warm_up + ticks)
+        for tick in range(warm_up + ticks):
+            timer.recording = tick >= warm_up
+            for event in script.get_events(tick):
+                start_game.evaluate_keypress(event)
+
+            # keep the amount of bullets the same throughout the run
+            while len(groups.bullets) < bullet_count:
+                groups.bullet_pool.acquire().spawn(start_game.player, start_game.player.direction)
+
+            start = default_timer()
+            start_game.update_world()
+            updated = default_timer()
+            start_game.draw_world(1.0)
+            drawn = default_timer()
+
+            timer.add("updating", updated - start)
+            timer.add("drawing", drawn - updated)
+            timer.add("total", drawn - start)
+    finally:
+        game.Rules.spawn_count = spawn_count
+
+    pygame.quit()
+    return timer.get_results(ticks)
+
+
+# returns the name used for a case in the results
+def get_case_name(platform_count, enemy_count, bullet_count):
+    return "platforms={} enemies={} bullets={}".format(platform_count, enemy_count, bullet_count)
+
+
+# returns a message for every phase that got slower than the baseline by more than the threshold
+def find_regressions(results, baseline, threshold):
+    regressions = []
+    for case, phases in sorted(results["cases"].items()):
+        if case not in baseline["cases"]:
+            continue
+        for phase in PHASES:
+            now = phases[phase]["mean_ms"]
+            before = baseline["cases"][case][phase]["mean_ms"]
+            if max(now, before) < NOISE_FLOOR:
+                continue
+            if now > before * (1 + threshold):
+                regressions.append("{} {}: {:.4f} ms -> {:.4f} ms ({:+.0f}%)".format(
+                    case, phase, before, now, (now / before - 1) * 100 if before > 0 else float("inf")))
+    return regressions
+
+
+# prints the average milliseconds per tick for every phase of the cases with the passed in names
+def print_results(results, names):
+    print "{:<40}".format("case") + "".join("{:>10}".format(phase) for phase in PHASES)
+    for case in names:
+        phases = results["cases"][case]
+        print "{:<40}".format(case) + "".join("{:>10.4f}".format(phases[phase]["mean_ms"]) for phase in PHASES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the hot paths of the game loop in synthetic levels")
+    parser.add_argument("--cases", choices=["quick", "full"], default="quick", help="which set of cases to run")
+    parser.add_argument("--ticks", type=int, default=500, help="how many ticks to time for every case")
+    parser.add_argument("--output", help="write the results as JSON into this file")
+    parser.add_argument("--baseline", help="a results file from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="how much slower (0.25 is 25%%) a phase can get before it counts as a regression")
+    parser.add_argument("--physics", choices=["scalar", "numpy"], default="scalar", help="which physics engine to time")
+    arguments = parser.parse_args()
+    game.Rules.physics_backend = arguments.physics
+
+    # the synthetic levels are parsed every time so that they are timed the same way on every run
+    # and never take the place of the real levels in the level cache
+    game.Rules.level_cache = False
+
+    cases = QUICK_CASES if arguments.cases == "quick" else FULL_CASES
+    results = {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "ticks": arguments.ticks,
+        "physics": arguments.physics,
+        "cases": {}
+    }
+
+    names = [get_case_name(*case) for case in cases]
+    directory = tempfile.mkdtemp(prefix="bench_levels_")
+    try:
+        for name, (platform_count, enemy_count, bullet_count) in zip(names, cases):
+            results["cases"][name] = run_case(platform_count, enemy_count, bullet_count, arguments.ticks, directory)
+    finally:
+        shutil.rmtree(directory)
+
+    print_results(results, names)
+
+    if arguments.output is not None:
+        with open(arguments.output, "w") as output:
+            json.dump(results, output, indent=4, sort_keys=True)
+
+    if arguments.baseline is not None:
+        with open(arguments.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = find_regressions(results, baseline, arguments.threshold)
+        if regressions:
+            print "\nRegressions compared to {}:".format(arguments.baseline)
+            for regression in regressions:
+                print "  " + regression
+            sys.exit(1)
+        else:
+            print "\nNo regressions compared to {}".format(arguments.baseline)
+
+
+if __name__ == "__main__":
+    main()
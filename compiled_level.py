@@ -0,0 +1,140 @@
+import os
+import json
+import mmap
+import struct
+import argparse
+from level_stream import split_level, DEFAULT_CHUNK_WIDTH
+
+# the first bytes of every compiled level
+MAGIC = "STGB"
+VERSION = 1
+
+# magic, version, chunk width, then the offset and length of the rules, the types, the chunk table and the platforms
+HEADER = struct.Struct("<4sHxxI4I2I2I")
+
+# the left and right side of a chunk, the index of its first platform and how many platforms it has
+CHUNK = struct.Struct("<2i2I")
+
+# x, y, width, height, red, green, blue, type id and order of a platform
+PLATFORM = struct.Struct("<4i3BxHxxI")
+
+
+class CompiledLevelException(Exception):
+    pass
+
+
+# class to represent a level compiled into the binary .stgb format, the file is memory mapped
+# and a chunk's platforms are only unpacked when that chunk is loaded, so opening a level only
+# reads the header, the rules and the chunk table no matter how big the level is
+class CompiledLevel:
+
+    def __init__(self, filename):
+        self.file = open(filename, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.data) < HEADER.size:
+            raise CompiledLevelException("{} is too short to be a compiled level".format(filename))
+        header = HEADER.unpack_from(self.data, 0)
+        if header[0] != MAGIC or header[1] != VERSION:
+            raise CompiledLevelException("{} is not a version {} compiled level".format(filename, VERSION))
+
+        self.chunk_width = header[2]
+        self.rules = self.read_json(header[3], header[4])
+        self.type_names = self.read_json(header[5], header[6])
+        chunk_offset, chunk_count = header[7], header[8]
+        self.platform_offset, self.platform_count = header[9], header[10]
+
+        self.bounds = []
+        self.chunks = []
+        for index in range(chunk_count):
+            left, right, first, count = CHUNK.unpack_from(self.data, chunk_offset + index * CHUNK.size)
+            self.bounds.append((left, right))
+            self.chunks.append((first, count))
+
+    # returns the JSON stored at the passed in offset
+    def read_json(self, offset, length):
+        return json.loads(self.data[offset:offset + length].decode("utf-8"))
+
+    # returns the platforms in the chunk at the passed in index as (order, x, y, width, height, color, type)
+    def load_chunk(self, index):
+        first, count = self.chunks[index]
+        records = []
+        offset = self.platform_offset + first * PLATFORM.size
+        for i in range(count):
+            x, y, width, height, red, green, blue, type_id, order = PLATFORM.unpack_from(self.data, offset)
+            records.append((order, x, y, width, height, (red, green, blue), self.type_names[type_id]))
+            offset += PLATFORM.size
+        return records
+
+    # returns the level as it would be in a .stg file
+    def to_level(self):
+        records = []
+        for index in range(len(self.chunks)):
+            records.extend(self.load_chunk(index))
+        records.sort()
+        platforms = [{"type": ptype, "x": x, "y": y, "width": width, "height": height, "color": list(color)}
+                     for order, x, y, width, height, color, ptype in records]
+        return {"rules": self.rules, "platforms": platforms}
+
+    # unmaps and closes the file
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+# writes the passed in level (as it would be in a .stg file) to the passed in file in the compiled format,
+# the platforms are split into chunks the same way as a chunked level so the game can stream them in
+def write_compiled_level(level, filename, chunk_width=DEFAULT_CHUNK_WIDTH):
+    rules = json.dumps(level["rules"]).encode("utf-8")
+    type_names = []
+    table = []
+    platforms = []
+    for left, right, rows in split_level(level, chunk_width):
+        table.append(CHUNK.pack(left, right, len(platforms), len(rows)))
+        for order, row in rows:
+            if row["type"] not in type_names:
+                type_names.append(row["type"])
+            color = row["color"]
+            platforms.append(PLATFORM.pack(int(row["x"]), int(row["y"]), int(row["width"]), int(row["height"]),
+                                           color[0], color[1], color[2], type_names.index(row["type"]), order))
+    types = json.dumps(type_names).encode("utf-8")
+
+    # the blocks come one after the other right after the header
+    rules_offset = HEADER.size
+    types_offset = rules_offset + len(rules)
+    chunk_offset = types_offset + len(types)
+    platform_offset = chunk_offset + len(table) * CHUNK.size
+
+    with open(filename, "wb") as level_file:
+        level_file.write(HEADER.pack(MAGIC, VERSION, chunk_width, rules_offset, len(rules), types_offset, len(types),
+                                     chunk_offset, len(table), platform_offset, len(platforms)))
+        level_file.write(rules)
+        level_file.write(types)
+        level_file.write("".join(table))
+        level_file.write("".join(platforms))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converts a level between the .stg format and the compiled .stgb format, "
+                                                 "the direction is chosen by the extension of the input file")
+    parser.add_argument("input", help="the level to convert")
+    parser.add_argument("output", help="where to write the converted level")
+    parser.add_argument("--chunk-width", type=int, default=DEFAULT_CHUNK_WIDTH,
+                        help="how wide each chunk is in pixels when compiling")
+    arguments = parser.parse_args()
+
+    if os.path.splitext(arguments.input)[1] == ".stgb":
+        compiled = CompiledLevel(arguments.input)
+        level = compiled.to_level()
+        compiled.close()
+        with open(arguments.output, "w") as level_file:
+            json.dump(level, level_file, indent=4)
+    else:
+        with open(arguments.input) as level_file:
+            level = json.load(level_file)
+        write_compiled_level(level, arguments.output, arguments.chunk_width)
+    print "Converted {} platforms from {} to {}".format(len(level["platforms"]), arguments.input, arguments.output)
+
+
+if __name__ == "__main__":
+    main()
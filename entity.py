@@ -0,0 +1,91 @@
+# class to represent anything that moves around in the game (the player, enemies and bullets),
+# it takes the place of pygame.sprite.Sprite so that subclasses can use __slots__ instead of
+# a __dict__ and so that joining and leaving groups is cheap
+class Entity(object):
+
+    __slots__ = ("memberships",)
+
+    def __init__(self, *groups):
+        # the groups that the entity belongs to
+        self.memberships = []
+        self.add(*groups)
+
+    # adds the entity to the passed in groups, the group is told first so that if it still holds
+    # the entity from before it was killed, that entry is cleaned up instead of being kept twice
+    def add(self, *groups):
+        for group in groups:
+            if group not in self.memberships:
+                group.add_internal(self)
+                self.memberships.append(group)
+
+    # removes the entity from the passed in groups
+    def remove(self, *groups):
+        for group in groups:
+            if group in self.memberships:
+                self.memberships.remove(group)
+                group.remove_internal(self)
+
+    # removes the entity from every group that it belongs to
+    def kill(self):
+        for group in self.memberships:
+            group.remove_internal(self)
+        self.memberships = []
+
+    # returns True if the entity belongs to any group
+    def alive(self):
+        return len(self.memberships) > 0
+
+    # updates the entity, does nothing unless a subclass overrides it
+    def update(self):
+        pass
+
+
+# class to represent a group of entities, the entities are kept in a list that is iterated over
+# directly instead of being copied. Removing an entity only marks the group, the entity is taken
+# out of the list the next time the group is used, so removing while iterating is safe
+class EntityGroup(object):
+
+    def __init__(self):
+        self.entities = []
+
+        # True if entities were removed since the list was last cleaned up
+        self.dirty = False
+
+    # called by an entity when it joins the group
+    def add_internal(self, entity):
+        if self.dirty:
+            self.compact()
+        self.entities.append(entity)
+
+    # called by an entity when it leaves the group
+    def remove_internal(self, entity):
+        self.dirty = True
+
+    # takes the entities that left the group out of the list, the list is replaced instead of
+    # changed so that anything that is iterating over the old list is not affected
+    def compact(self):
+        self.entities = [entity for entity in self.entities if self in entity.memberships]
+        self.dirty = False
+
+    # returns the list of entities in the group in the order they joined, the list belongs to the
+    # group so it must not be changed and should be copied if it is needed after the group changes
+    def sprites(self):
+        if self.dirty:
+            self.compact()
+        return self.entities
+
+    # updates every entity in the group, entities that join the group
+    # during the update are not updated until the next time
+    def update(self):
+        entities = self.sprites()
+        for index in range(len(entities)):
+            entities[index].update()
+
+    def __iter__(self):
+        return iter(self.sprites())
+
+    def __len__(self):
+        return len(self.sprites())
+
+    def __contains__(self, entity):
+        return self in entity.memberships
@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import cProfile
+
+# the extension of the snapshot files and of the cProfile sample that can go with each one
+SNAPSHOT_EXTENSION = ".json"
+PROFILE_EXTENSION = ".prof"
+
+
+# class to watch the time that every frame takes and write a snapshot of the game into a directory
+# whenever a frame goes over its budget, the next few frames can also be profiled with cProfile.
+# Only the newest snapshots are kept, the oldest ones are deleted once there are too many of them
+class Watchdog:
+
+    def __init__(self, directory, budget, max_snapshots, profile_frames, cooldown, get_state):
+        self.directory = directory
+
+        # how many milliseconds a frame can take before it is too slow
+        self.budget = budget
+        self.max_snapshots = max_snapshots
+
+        # how many frames after a slow one are profiled, 0 if they aren't
+        self.profile_frames = profile_frames
+
+        # how many frames have to pass after a snapshot before another one is written
+        self.cooldown = cooldown
+
+        # returns a dict describing the state of the game, only called when a snapshot is written
+        self.get_state = get_state
+
+        self.frames = 0
+        self.last_snapshot = None
+
+        # the profile of the frames after the last slow one, the name of its
+        # snapshot and the frame that profiling stops at, None if nothing is being profiled
+        self.profile = None
+        self.profile_name = None
+        self.profile_end = 0
+
+    # checks the frame that was just timed (a dict of each phase to the seconds it took), writing
+    # a snapshot if it went over the budget, frames that are being profiled aren't checked
+    def check(self, frame):
+        self.frames += 1
+        if self.profile is not None:
+            if self.frames >= self.profile_end:
+                self.stop_profile()
+            return
+
+        milliseconds = sum(frame.values()) * 1000.0
+        if milliseconds > self.budget and (self.last_snapshot is None
+                                           or self.frames - self.last_snapshot >= self.cooldown):
+            self.last_snapshot = self.frames
+            name = self.write_snapshot(frame, milliseconds)
+            if self.profile_frames > 0:
+                self.start_profile(name)
+
+    # writes a snapshot of the slow frame and the game, returns the name of the snapshot without its extension
+    def write_snapshot(self, frame, milliseconds):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        name = "{}-{:08d}".format(time.strftime("%Y%m%d-%H%M%S"), self.frames)
+        snapshot = {
+            "frame": self.frames,
+            "frame_ms": milliseconds,
+            "budget_ms": self.budget,
+            "phases_ms": dict((phase, seconds * 1000.0) for phase, seconds in frame.items()),
+            "state": self.get_state()
+        }
+        with open(os.path.join(self.directory, name + SNAPSHOT_EXTENSION), "w") as snapshot_file:
+            json.dump(snapshot, snapshot_file, indent=4, sort_keys=True)
+        self.evict()
+        return name
+
+    # starts profiling the frames that come after the slow frame with the passed in snapshot name
+    def start_profile(self, name):
+        self.profile = cProfile.Profile()
+        self.profile_name = name
+        self.profile_end = self.frames + self.profile_frames
+        self.profile.enable()
+
+    # stops profiling and writes the profile next to its snapshot, it can be read with the pstats module
+    def stop_profile(self):
+        self.profile.disable()
+        self.profile.dump_stats(os.path.join(self.directory, self.profile_name + PROFILE_EXTENSION))
+        self.profile = None
+        self.profile_name = None
+
+    # deletes the oldest snapshots (and their profiles) until there are few enough of them
+    def evict(self):
+        names = sorted(os.path.splitext(name)[0] for name in os.listdir(self.directory)
+                       if name.endswith(SNAPSHOT_EXTENSION))
+        for name in names[:max(0, len(names) - self.max_snapshots)]:
+            for extension in (SNAPSHOT_EXTENSION, PROFILE_EXTENSION):
+                path = os.path.join(self.directory, name + extension)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    # stops profiling if the game ends while frames are still being profiled
+    def close(self):
+        if self.profile is not None:
+            self.stop_profile()
@@ -1,11 +1,31 @@
 import pygame
 import random
-import math
-from platform_config import Platform
+from platform_config import PlatformStore
+from spatial import PlatformGrid, GroundIndex, UnitGrid
+from rendering import StaticLayer, DirtyRects, TextCache, Hud, SpriteCache, blit_batch
 import GLOBALS
 from GLOBALS import BLACK
-import json
-import sys
+import os
+import argparse
+from timeit import default_timer
+from input_script import load_script, patrol_script, InputRecorder
+from trajectory import TrajectoryCache
+from pool import Pool
+from profiler import FrameProfiler, PHASES
+from trace_events import TraceWriter
+from frame_watchdog import Watchdog
+from gc_control import GcControl
+from entity import Entity, EntityGroup
+from level_stream import JsonLevel, ChunkedLevel, LevelStreamer, UNIT_MARGIN
+from compiled_level import CompiledLevel
+from level_cache import LevelCache
+from unit_arrays import UnitStore, ArrayUnit, ArrayUnitGrid, PlatformGridArrays, LEFT, RIGHT, UP, DOWN
+
+# numpy is only needed for the batched physics engine
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 # class containing all of the groups in the game
@@ -13,14 +33,19 @@ import sys
 # object that is initialized later
 class GameGroups:
     def __init__(self):
-        self.players = pygame.sprite.Group()
-        self.enemies = pygame.sprite.Group()
-        self.bullets = pygame.sprite.Group()
-        self.gravity_units = pygame.sprite.Group()
+        self.players = EntityGroup()
+        self.enemies = EntityGroup()
+        self.bullets = EntityGroup()
+        self.gravity_units = EntityGroup()
         self.platforms = pygame.sprite.Group()
-        self.scrolling_units = pygame.sprite.Group()
         self.world_posn = [0, 0]
         self.screen = None
+        self.platform_store = None
+        self.platform_grid = None
+        self.ground_index = None
+        self.unit_grid = None
+        self.bullet_pool = None
+        self.enemy_pool = None
 
 # initializing groups
 groups = GameGroups()
@@ -51,9 +76,21 @@ class Rules:
     # This represents how many seconds must pass until a new enemy is spawned
     spawn_rate = 1
 
-    # Represents how many ticks there should be in a second
+    # Represents how many ticks there should be in a second, the game is always
+    # updated at this rate no matter how fast the frames are drawn
     clock_tick = 100
 
+    # Represents the most frames that should be drawn in a second, zero for no limit
+    frame_rate = 100
+
+    # The most ticks that can be caught up on in one frame, if the game falls
+    # further behind than this then it slows down instead of freezing up
+    max_ticks_per_frame = 10
+
+    # Draws units between where they were in the last two ticks if True, this
+    # keeps the motion smooth when the frame rate and clock_tick don't line up
+    interpolate = True
+
     # How many seconds of immortality does the player get after getting hit
     immortality = 2
 
@@ -66,15 +103,117 @@ class Rules:
     # The height of the floor
     floor_height = GLOBALS.floor_height
 
+    # The size (in pixels) of the cells in the grid used for platform collision
+    grid_cell_size = 200
+
+    # The size (in pixels) of the cells in the grid of enemies used for bullet and player collision
+    unit_grid_cell_size = 100
+
+    # How many ticks of every jump, free fall and knock back are calculated ahead of time when the
+    # level loads, anything longer than this is calculated the first time that it is needed
+    trajectory_ticks = 64
+
+    # How many bullets and enemies are created ahead of time and kept around to be used again
+    bullet_pool_size = 50
+    enemy_pool_size = 20
+
+    # Draws the background and platforms from surfaces baked when they first come into view if True
+    prerender_platforms = True
+
+    # The most surfaces of the shapes that enemies, bullets and platforms are drawn with that are kept
+    # so that they don't have to be drawn again, shapes bigger than the screen are never kept
+    sprite_cache_size = 128
+
+    # The most chunks of the baked background and platforms that are kept at one time
+    prerendered_chunks = 6
+
+    # How far (in pixels) past each side of the screen the chunks of a chunked level are loaded
+    stream_margin = size[0]
+
+    # The most chunks of a chunked level that are kept loaded, the ones furthest from the screen are unloaded first
+    max_level_chunks = 12
+
+    # The most chunks that are not on the screen yet that can be loaded in one tick
+    chunk_loads_per_tick = 1
+
+    # Keeps a compiled copy of every .stg level that is played in the cache directory if True,
+    # so the next time it is played it starts up without parsing the level again
+    level_cache = True
+    level_cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".level_cache")
+
+    # The most compiled levels that are kept in the cache, the ones that went the longest without being played are deleted
+    level_cache_entries = 16
+
+    # Only sends the parts of the screen that changed to the display if True, the
+    # whole screen is still sent whenever the screen scrolls
+    dirty_rect_updates = False
+
+    # Shows the player's HP, the enemies killed and the frame rate in the corner of the screen if True
+    show_hud = False
+
+    # The most pieces of rendered text that are kept so that they don't have to be rendered again
+    text_cache_size = 64
+
+    # How many of the last frames the profiler averages over, the profiler is turned on and off
+    # with the 'p' key when debug_mode is True and shows how long each part of a frame took
+    profiled_frames = 60
 
-# class that represents screen scrolling mechanics
+    # Writes a snapshot of the game into watchdog_dir whenever a frame takes longer than frame_budget
+    # milliseconds if True, only the newest watchdog_snapshots snapshots are kept, without a frame
+    # rate limit the budget is the length of a tick
+    watchdog = False
+    frame_budget = 1000.0 / (frame_rate or clock_tick)
+    watchdog_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "slow_frames")
+    watchdog_snapshots = 20
+
+    # How many frames after a slow one are profiled with cProfile and saved next to its snapshot, 0 turns it off
+    watchdog_profile_frames = 0
+
+    # How many frames have to pass after a snapshot before the next one is written
+    watchdog_cooldown = 100
+
+    # Turns off the automatic garbage collector once the level has loaded and only collects garbage after a
+    # frame that finished under frame_budget if True, when debug_mode is also True the frame profiler shows
+    # how much the live memory changed in the last frame (a net change, not everything that was allocated)
+    manual_gc = False
+
+    # How many frames in a row can go over frame_budget before garbage is collected anyway
+    gc_max_skipped_frames = 30
+
+    # Which physics engine to use, either "scalar" or "numpy", the numpy engine keeps the player and the enemies
+    # in arrays and moves every enemy at once, it needs numpy to be installed and is worth it with lots of enemies
+    physics_backend = "scalar"
+
+
+# returns where a unit should be drawn between its last position and its current position,
+# alpha is how far along the game is from the last tick to the next one (from 0 to 1)
+def interpolate(last_posn, posn, alpha):
+    if alpha == 1:
+        return posn
+    return [last_posn[0] + (posn[0] - last_posn[0]) * alpha, last_posn[1] + (posn[1] - last_posn[1]) * alpha]
+
+
+# class that represents screen scrolling mechanics, every unit is kept in world
+# coordinates and the world posn acts as the camera, so scrolling only moves
+# the camera and the player instead of every piece in the world
 class Screen:
 
     def __init__(self):
         self.should_scroll = None
 
-    # moves all the pieces but the player by the amount that the player
-    # moved either to the right or left
+    # converts an x coordinate in the world to where it is on the screen
+    def to_screen(self, x):
+        return x + groups.world_posn[0]
+
+    # returns the part of the world that is visible on the screen when the camera is at the passed in offset
+    def get_viewport(self, offset):
+        return pygame.Rect(-offset, 0, size[0], size[1])
+
+    # returns the x coordinate of the player when it is centered on the screen
+    def center_of_screen(self, player):
+        return (size[0] / 2) - (player.WIDTH / 2)
+
+    # scrolls the screen by the amount that the player moved either to the right or left
     def scroll_pieces(self, player_displacement):
 
         player = groups.players.sprites()[0]
@@ -85,15 +224,12 @@ class Screen:
             player.posn[0] += player_displacement
 
         # since the player is not at the edge of the map, center the player
-        elif not (player.posn[0] == ((size[0] / 2) - (player.WIDTH / 2))):
+        elif not (self.to_screen(player.posn[0]) == self.center_of_screen(player)):
             self.center_player(player_displacement)
 
         # since the player is already centered, simply scroll the screen
         else:
-            self.apply_displacement_to_all_pieces(player_displacement)
-
-            # scroll the 'world' as well
-            groups.world_posn[0] -= player_displacement
+            self.move_camera(player_displacement)
 
         # make sure the world is kept in place when you reach the end of it
         self.bound_the_world(player_displacement)
@@ -101,19 +237,18 @@ class Screen:
     def bound_the_world(self, player_displacement):
         # keeps the world at the x coordinate zero if player is at the left side of the map
         if player_displacement < 0 < groups.world_posn[0]:
-            self.apply_displacement_to_all_pieces(groups.world_posn[0])
-            groups.world_posn[0] = 0
+            self.move_camera(groups.world_posn[0])
 
         # keeps the world at the x coordinate size[0] - world_size[0] since the player is on the right side of map
         elif player_displacement > 0 and groups.world_posn[0] + world_size[0] < size[0]:
-            self.apply_displacement_to_all_pieces((groups.world_posn[0] + world_size[0]) - size[0])
-            groups.world_posn[0] = size[0] - world_size[0]
+            self.move_camera((groups.world_posn[0] + world_size[0]) - size[0])
 
-    # scrolls all pieces that are supposed to be scrolled
-    def apply_displacement_to_all_pieces(self, displacement):
-        for unit in groups.scrolling_units.sprites():
-            unit.posn[0] -= displacement
-            unit.update_rect()
+    # scrolls the 'world' by moving the camera, the player moves along with
+    # the camera so that it stays in the same place on the screen
+    def move_camera(self, displacement):
+        player = groups.players.sprites()[0]
+        player.posn[0] += displacement
+        groups.world_posn[0] -= displacement
 
     # puts the player in the center and scrolls all pieces accordingly
     def center_player(self, player_displacement):
@@ -124,11 +259,11 @@ class Screen:
 
         # account for the player moving away from the edges from the map by centering the
         # player according to where the player was and what direction the player was heading
-        if player.posn[0] > ((size[0] / 2) - (player.WIDTH / 2)) and player_displacement > 0:
-            player.posn[0] = ((size[0] / 2) - (player.WIDTH / 2))
+        if self.to_screen(player.posn[0]) > self.center_of_screen(player) and player_displacement > 0:
+            player.posn[0] = self.center_of_screen(player) - groups.world_posn[0]
 
-        elif player.posn[0] < ((size[0] / 2) - (player.WIDTH / 2)) and player_displacement < 0:
-            player.posn[0] = ((size[0] / 2) - (player.WIDTH / 2))
+        elif self.to_screen(player.posn[0]) < self.center_of_screen(player) and player_displacement < 0:
+            player.posn[0] = self.center_of_screen(player) - groups.world_posn[0]
 
         # if the previous to conditions were False, then there is no need to center the player
         else:
@@ -138,6 +273,14 @@ class Screen:
 groups.screen = Screen()
 
 
+# puts every group back to how it was before the game started, this is
+# needed to run more than one game from the same process (like the benchmarks do)
+def reset_groups():
+    global groups
+    groups = GameGroups()
+    groups.screen = Screen()
+
+
 # physics engine for free fall, gravity and etc
 class Physics:
 
@@ -148,42 +291,53 @@ class Physics:
 
         self.tick = 0
 
-    # takes in a platform object and the units previous position
+        # the displacements of every trajectory are looked up from tables instead of calculated every tick
+        self.trajectories = TrajectoryCache(Rules.trajectory_ticks)
+        for max_jump in set([Player.max_jump, Enemy.max_jump]):
+            self.trajectories.get_table("jump", max_jump)
+        self.trajectories.get_table("free fall")
+        self.trajectories.get_table("knock back x", self.knock_back_constant_x)
+        self.trajectories.get_table("knock back y", self.knock_back_constant_y)
+
+    # takes in the indexes of platforms and the units previous position
     # and returns the highest platform that the player is above
     def get_highest_platform(self, landing, posn):
+        store = groups.platform_store
         highest_platform = None
         for land in landing:
             if highest_platform is None:
                 highest_platform = land
-            elif posn < land.rect.top < highest_platform.rect.top:
+            elif posn < store.y[land] < store.y[highest_platform]:
                 highest_platform = land
             else:
                 pass
         return highest_platform
 
-    # takes in a platform object and the units previous position
+    # takes in the indexes of platforms and the units previous position
     # and returns the lowest platform that the player is below
     def get_lowest_platform(self, landing, posn):
+        store = groups.platform_store
         lowest_platform = None
         for land in landing:
             if lowest_platform is None:
                 lowest_platform = land
-            elif posn > land.rect.top > lowest_platform.rect.top:
+            elif posn > store.y[land] > store.y[lowest_platform]:
                 lowest_platform = land
             else:
                 pass
         return lowest_platform
 
-    # takes in the sprite, it's last position and a platform
+    # takes in the sprite, it's last position and the index of a platform
     # and returns True if the unit is either completely below
     # or completely above the platform
     def completely_above_or_below(self, unit, posn, platform):
-        return posn <= platform.rect.top - unit.HEIGHT or posn >= platform.rect.top + platform.rect.height
+        store = groups.platform_store
+        return posn <= store.y[platform] - unit.HEIGHT or posn >= store.y[platform] + store.height[platform]
 
     # checks to see if any units are being blocked by a platform
     # and adjusts their attributes accordingly
     def check_for_blockage(self, unit):
-        platforms = pygame.sprite.spritecollide(unit, groups.platforms, dokill=False)
+        platforms = groups.platform_grid.collide(unit.rect)
         if len(platforms) > 0:
             for platform in platforms:
                 self.adjust_for_blockage(unit, platform)
@@ -191,8 +345,9 @@ class Physics:
     # adjusts the units attributes accordingly, set if_happened=True
     # for the function to return whether a blockage occurred
     def adjust_for_blockage(self, unit, platform, if_happened=False):
+        store = groups.platform_store
         # if the player is inside of the platform
-        if platform.rect.left - unit.WIDTH < unit.posn[0] < platform.rect.left + platform.rect.width:
+        if store.x[platform] - unit.WIDTH < unit.posn[0] < store.x[platform] + store.width[platform]:
             # check to see if the player is knocked back to know what direction to use
             # don't use knock_dir if it is "up" since there was no x change caused by
             # knock back in that specific case
@@ -206,19 +361,19 @@ class Physics:
 
             # keep the player on the side of the platform and scroll everything accordingly
             if direction == "right":
-                calculation = platform.rect.left - unit.WIDTH
-                if type(unit) == Player:
+                calculation = store.x[platform] - unit.WIDTH
+                if isinstance(unit, Player):
                     groups.screen.scroll_pieces(int(calculation - previous_x))
                 else:
-                    unit.posn[0] = platform.rect.left - unit.WIDTH
+                    unit.posn[0] = store.x[platform] - unit.WIDTH
                 unit.motion = False
                 unit.update_rect()
             elif direction == "left":
-                calculation = platform.rect.left + platform.rect.width
-                if type(unit) == Player:
+                calculation = store.x[platform] + store.width[platform]
+                if isinstance(unit, Player):
                     groups.screen.scroll_pieces(int(calculation - previous_x))
                 else:
-                    unit.posn[0] = platform.rect.left + platform.rect.width
+                    unit.posn[0] = store.x[platform] + store.width[platform]
                 unit.motion = False
                 unit.update_rect()
             else:
@@ -234,7 +389,8 @@ class Physics:
     # checks for general platform collisions and adjusts the units accordingly
     # based on the passed in unit and position
     def check_platform_collision(self, unit, last_posn):
-        landing = pygame.sprite.spritecollide(unit, groups.platforms, dokill=False)
+        store = groups.platform_store
+        landing = groups.platform_grid.collide(unit.rect)
         if len(landing) > 0:
             for platform in landing:
 
@@ -248,7 +404,7 @@ class Physics:
                     # so change all of unit's attributes accordingly
                     if unit.y_dir == "down":
                         highest_platform = self.get_highest_platform(landing, last_posn)
-                        unit.y_base = highest_platform.rect.top - unit.HEIGHT
+                        unit.y_base = store.y[highest_platform] - unit.HEIGHT
                         unit.posn[1] = unit.y_base
                         unit.gravity_time = 0
                         unit.knock_back_time = 0
@@ -260,7 +416,7 @@ class Physics:
                     # from underneath, so change all of the unit's attributes accordingly
                     else:
                         lowest_platform = self.get_lowest_platform(landing, last_posn)
-                        unit.y_base = lowest_platform.rect.top + lowest_platform.rect.height
+                        unit.y_base = store.y[lowest_platform] + store.height[lowest_platform]
                         unit.posn[1] = unit.y_base
                         unit.gravity_time = 1
                         unit.knock_back_time = 0
@@ -295,11 +451,7 @@ class Physics:
 
         # since jumping is it's own mechanism, don't apply free fall, otherwise apply free fall
         if not unit.jumping:
-            standing = []
-            for land in groups.platforms.sprites():
-                standing.append((unit.posn[1] + unit.HEIGHT == land.rect.top
-                                 and land.rect.left - unit.WIDTH < unit.posn[0] < land.rect.left + land.rect.width))
-            if True not in standing:
+            if not groups.ground_index.is_standing(unit.posn[0], unit.posn[1] + unit.HEIGHT, unit.WIDTH):
                 unit.free_fall = True
                 unit.gravity_time = 1
 
@@ -313,10 +465,12 @@ class Physics:
             # if the knock back is not blocked by a platform, move the screen accordingly
             if not unit.knock_back_blocked:
                 previous_x = unit.posn[0]
+                if isinstance(unit, Player):
+                    previous_x = groups.screen.to_screen(previous_x)
                 if unit.knock_dir == "left":
                     # if the player is knocked back you must scroll the screen, otherwise simply
                     # change the x coordinate of the unit
-                    if type(unit) == Player:
+                    if isinstance(unit, Player):
                         calculation = unit.x_base - self.calc_knock_x(unit.knock_back_time)
                         groups.screen.scroll_pieces(int(calculation - previous_x))
                     else:
@@ -324,7 +478,7 @@ class Physics:
                 elif unit.knock_dir == "right":
                     # if the player is knocked back you must scroll the screen, otherwise simply
                     # change the x coordinate of the unit
-                    if type(unit) == Player:
+                    if isinstance(unit, Player):
                         calculation = unit.x_base + self.calc_knock_x(unit.knock_back_time)
                         groups.screen.scroll_pieces(int(calculation - previous_x))
                     else:
@@ -339,28 +493,39 @@ class Physics:
             unit.update_rect()
             unit.knock_back_time += 1
 
+    # applies gravity and free fall to the passed in units and checks for collision
+    def gravity_step(self, units):
+        for unit in units:
+            # apply gravity and free fall only if the unit is not knocked back
+            if not self.is_knocked_back(unit):
+                last_y = unit.posn[1]
+                self.apply_gravity(unit)
+                self.check_platform_collision(unit, last_y)
+                self.check_for_free_fall(unit)
+
+    # applies knock back to the passed in units and checks for collision
+    def knock_back_step(self, units):
+        for unit in units:
+            last_y = unit.posn[1]
+            self.apply_knock_back(unit)
+            # check for platform collision if the unit is knocked back
+            if self.is_knocked_back(unit):
+                self.check_platform_collision(unit, last_y)
+
+    # checks to see if the passed in units hit into a platform from the side
+    def blockage_step(self, units):
+        for unit in units:
+            self.check_for_blockage(unit)
+
     # updates the physics engine
     def update(self):
         # every time the tick is 4, apply gravity
         if self.tick == 4:
-            units = groups.gravity_units.sprites()
-            for unit in units:
-                # apply gravity and free fall only if the unit is not knocked back
-                if not self.is_knocked_back(unit):
-                    last_y = unit.posn[1]
-                    self.apply_gravity(unit)
-                    self.check_platform_collision(unit, last_y)
-                    self.check_for_free_fall(unit)
+            self.gravity_step(groups.gravity_units.sprites())
             self.tick = 0
         # every time the tick is 2 and 4, apply knock back
         if self.tick == 4 or self.tick == 2:
-            units = groups.gravity_units.sprites()
-            for unit in units:
-                last_y = unit.posn[1]
-                self.apply_knock_back(unit)
-                # check for platform collision if the unit is knocked back
-                if self.is_knocked_back(unit):
-                    self.check_platform_collision(unit, last_y)
+            self.knock_back_step(groups.gravity_units.sprites())
             self.tick += 1
 
         # for each remaining tick, check to see if the unit hit into a platform
@@ -368,82 +533,352 @@ class Physics:
         # that is only possible if the unit is knocked back or experiencing gravity/free fall
         remaining_ticks = [0, 1, 3]
         if self.tick in remaining_ticks:
-            units = groups.gravity_units.sprites()
-            for unit in units:
-                self.check_for_blockage(unit)
+            self.blockage_step(groups.gravity_units.sprites())
             self.tick += 1
 
     # returns true if the unit is being knocked back
     def is_knocked_back(self, unit):
         return unit.knock_back_time > 0
 
-    # calculates the displacement for a unit that is jumping
+    # returns the displacement for a unit that is jumping
     def calc_disp(self, time, max_jump):
-        parabola_shift = int(math.sqrt(max_jump))
-        return (-2 * ((time - parabola_shift) * (time - parabola_shift))) + (2 * max_jump)
+        return self.trajectories.look_up(time, "jump", max_jump)
 
-    # calculates the displacement for a unit that is in free fall
+    # returns the displacement for a unit that is in free fall
     def free_fall(self, time):
-        return -3 * time * time
+        return self.trajectories.look_up(time, "free fall")
 
-    # calculates the x displacement for a unit that is knocked back
+    # returns the x displacement for a unit that is knocked back
     def calc_knock_x(self, time):
-        return math.sqrt(time) + self.knock_back_constant_x
+        return self.trajectories.look_up(time, "knock back x", self.knock_back_constant_x)
 
-    # calculates the y displacement for a unit that is knocked back
+    # returns the y displacement for a unit that is knocked back
     def calc_knock_y(self, time):
-        return (-1 * (time - self.knock_back_constant_y)
-                * (time - self.knock_back_constant_y)) + (self.knock_back_constant_y * self.knock_back_constant_y)
+        return self.trajectories.look_up(time, "knock back y", self.knock_back_constant_y)
+
+
+# physics engine that keeps the units in a unit store and moves every enemy at once with numpy instead of one
+# at a time. The platforms that the enemies collide with are found for all of them at once through the platform
+# grid, and then settled one platform at a time for every enemy together in the same order as the regular
+# engine. Units never affect each other so this gives exactly the same results as the regular engine, the
+# player is still moved by the regular engine since it scrolls the screen instead of moving by itself
+class BatchedPhysics(Physics):
+
+    def __init__(self, store):
+        Physics.__init__(self)
+        self.store = store
+
+        # the numpy copy of the platform grid's cells, made once the level has loaded
+        self.grid_arrays = None
+
+        # maps every trajectory table to how long it was when it was copied and its copy as a numpy array
+        self.tables = {}
+
+        # maps the top of every edge in the ground index to its lists of lefts and reaches and their numpy copies
+        self.ground = {}
+
+    # returns the displacements at every one of the passed in ticks of the profile with the passed in name and parameters
+    def look_up_all(self, times, name, *parameters):
+        table = self.trajectories.get_table(name, *parameters)
+        if len(times) > 0:
+            table.get(int(times.max()))
+        copy = self.tables.get(table)
+        if copy is None or copy[0] != len(table.values):
+            copy = (len(table.values), numpy.array(table.values))
+            self.tables[table] = copy
+        return copy[1][times]
+
+    # returns the numpy copies of the lefts and reaches of the edges of the ground index at the passed in top,
+    # or None for both if there are none there. The copies are made again once the ground index changes them
+    def get_ground(self, top):
+        lefts = groups.ground_index.lefts.get(top)
+        if lefts is None:
+            return None, None
+        copy = self.ground.get(top)
+        if copy is None or copy[0] is not lefts:
+            copy = (lefts, numpy.array(lefts), numpy.array(groups.ground_index.reaches[top]))
+            self.ground[top] = copy
+        return copy[1], copy[2]
+
+    # returns the slots of the passed in units that are moved all at once,
+    # along with a list of the rest of the units which are moved one at a time
+    def split(self, units):
+        slots = self.store.get_slots(units)
+        batched = self.store.batched[slots]
+        return slots[batched], self.store.units[slots[~batched]].tolist()
+
+    # returns the platforms that the units in the passed in slots collide with in rounds, the first round has the
+    # first platform of every unit that collides with something, the second round has the second platform of
+    # every unit that collides with at least two and so on. Each round is an array of positions in slots and an
+    # array of platforms, and every unit's platforms come in the same order as from PlatformGrid.collide
+    def get_collisions(self, slots):
+        store = self.store
+        if self.grid_arrays is None or self.grid_arrays.grid is not groups.platform_grid:
+            self.grid_arrays = PlatformGridArrays(groups.platform_grid)
+        units, platforms = self.grid_arrays.collide_all(store.rect[slots, 0], store.rect[slots, 1],
+                                                        store.width[slots], store.height[slots])
+        rounds = []
+        if len(units) == 0:
+            return rounds
+
+        # where each unit's platforms start and how many it has
+        firsts = numpy.flatnonzero(numpy.concatenate(([True], units[1:] != units[:-1])))
+        counts = numpy.diff(numpy.append(firsts, len(units)))
+        for count in range(counts.max()):
+            chosen = firsts[counts > count] + count
+            rounds.append((units[chosen], platforms[chosen]))
+        return rounds
+
+    # the same as adjust_for_blockage for every unit in the passed in slots and the platform next to it
+    def adjust_all_for_blockage(self, slots, platforms):
+        if len(slots) == 0:
+            return
+        store = self.store
+        x = numpy.frombuffer(groups.platform_store.x, dtype=numpy.int32)[platforms]
+        width = numpy.frombuffer(groups.platform_store.width, dtype=numpy.int32)[platforms]
+
+        # the units that are inside of their platform
+        posn_x = store.posn[slots, 0]
+        inside = (x - store.width[slots] < posn_x) & (posn_x < x + width)
+
+        # use knock_dir for the units that are knocked back unless it is "up"
+        knocked = (store.knock_back_time[slots] > 0) & (store.knock_dir[slots] != UP)
+        direction = numpy.where(knocked, store.knock_dir[slots], store.direction[slots])
+
+        # keep the units on the side of their platform
+        right = inside & (direction == RIGHT)
+        left = inside & (direction == LEFT)
+        store.posn[slots[right], 0] = x[right] - store.width[slots[right]]
+        store.posn[slots[left], 0] = x[left] + width[left]
+        moved = slots[right | left]
+        store.motion[moved] = False
+        store.update_rects(moved)
+
+        store.knock_back_blocked[slots[inside]] = True
+
+    # the same as check_platform_collision for every unit in the passed in slots and its last y
+    def check_all_platform_collision(self, slots, last_ys):
+        rounds = self.get_collisions(slots)
+        if len(rounds) == 0:
+            return
+        store = self.store
+        y = numpy.frombuffer(groups.platform_store.y, dtype=numpy.int32)
+        height = numpy.frombuffer(groups.platform_store.height, dtype=numpy.int32)
+
+        # the same as get_highest_platform and get_lowest_platform for every unit that collides with a platform
+        colliding, highest = rounds[0]
+        lowest = highest.copy()
+        for units, platforms in rounds[1:]:
+            index = numpy.searchsorted(colliding, units)
+            last_y = last_ys[units]
+            higher = (last_y < y[platforms]) & (y[platforms] < y[highest[index]])
+            highest[index[higher]] = platforms[higher]
+            lower = (last_y > y[platforms]) & (y[platforms] > y[lowest[index]])
+            lowest[index[lower]] = platforms[lower]
+
+        for units, platforms in rounds:
+            index = numpy.searchsorted(colliding, units)
+            last_y = last_ys[units]
+            units = slots[units]
+
+            # the units that are not completely above or below their platform are adjusted for blockage
+            above_or_below = (last_y <= y[platforms] - store.height[units]) \
+                | (last_y >= y[platforms] + height[platforms])
+            self.adjust_all_for_blockage(units[~above_or_below], platforms[~above_or_below])
+            down = store.y_dir[units] == DOWN
+
+            # the units that are going down land on their highest platform
+            landing = above_or_below & down
+            platform = highest[index[landing]]
+            landing = units[landing]
+            store.y_base[landing] = y[platform] - store.height[landing]
+            store.posn[landing, 1] = store.y_base[landing]
+            store.gravity_time[landing] = 0
+            store.knock_back_time[landing] = 0
+            store.knock_back_blocked[landing] = False
+            store.free_fall[landing] = False
+            store.jumping[landing] = False
+
+            # the rest hit into their lowest platform from underneath
+            hitting = above_or_below & ~down
+            platform = lowest[index[hitting]]
+            hitting = units[hitting]
+            store.y_base[hitting] = y[platform] + height[platform]
+            store.posn[hitting, 1] = store.y_base[hitting]
+            store.gravity_time[hitting] = 1
+            store.knock_back_time[hitting] = 0
+            store.knock_back_blocked[hitting] = False
+            store.free_fall[hitting] = True
+            store.jumping[hitting] = False
+            store.y_dir[hitting] = DOWN
+        store.update_rects(slots[colliding])
+
+    # the same as apply_gravity for every unit in the passed in slots
+    def apply_all_gravity(self, slots):
+        store = self.store
+        time = store.gravity_time[slots]
+        falling = store.free_fall[slots]
+        moving = time != 0
+
+        # the units that are jumping, the ones that have reached the highest point of the jump start going down
+        chosen = moving & ~falling
+        if chosen.any():
+            jumping = slots[chosen]
+            max_jump = store.max_jump[jumping]
+            disp = numpy.zeros(len(jumping))
+            for height in numpy.unique(max_jump).tolist():
+                same = max_jump == height
+                disp[same] = self.look_up_all(time[chosen][same], "jump", height)
+            store.y_dir[jumping[disp == max_jump * 2]] = DOWN
+            store.posn[jumping, 1] = store.y_base[jumping] - disp
+
+        # the units that are in free fall
+        chosen = moving & falling
+        if chosen.any():
+            store.posn[slots[chosen], 1] = store.y_base[slots[chosen]] - self.look_up_all(time[chosen], "free fall")
+
+        moving = slots[moving]
+        store.gravity_time[moving] += 1
+        store.update_rects(moving)
+
+    # the same as check_for_free_fall for every unit in the passed in slots
+    def check_all_for_free_fall(self, slots):
+        store = self.store
+        slots = slots[~store.free_fall[slots] & ~store.jumping[slots]]
+        if len(slots) == 0:
+            return
+        if groups.ground_index.changed:
+            groups.ground_index.rebuild()
+
+        # the same as GroundIndex.is_standing for the units standing at each height
+        x = store.posn[slots, 0]
+        rights = x + store.width[slots]
+        bottoms = store.posn[slots, 1] + store.height[slots]
+        standing = numpy.zeros(len(slots), dtype=bool)
+        for bottom in numpy.unique(bottoms).tolist():
+            lefts, reaches = self.get_ground(bottom)
+            if lefts is not None:
+                same = bottoms == bottom
+                index = numpy.searchsorted(lefts, rights[same])
+                standing[same] = (index > 0) & (reaches[numpy.maximum(index - 1, 0)] > x[same])
+
+        falling = slots[~standing]
+        store.free_fall[falling] = True
+        store.gravity_time[falling] = 1
+
+    # applies gravity and free fall to the passed in units and checks for collision
+    def gravity_step(self, units):
+        slots, others = self.split(units)
+        Physics.gravity_step(self, others)
+
+        # apply gravity and free fall only if the unit is not knocked back
+        slots = slots[self.store.knock_back_time[slots] == 0]
+        if len(slots) == 0:
+            return
+        last_ys = self.store.posn[slots, 1]
+        self.apply_all_gravity(slots)
+        self.check_all_platform_collision(slots, last_ys)
+        self.check_all_for_free_fall(slots)
+
+    # applies knock back to the passed in units and checks for collision
+    def knock_back_step(self, units):
+        slots, others = self.split(units)
+        Physics.knock_back_step(self, others)
+
+        # only the units that are knocked back move and check for platform collision
+        store = self.store
+        slots = slots[store.knock_back_time[slots] > 0]
+        if len(slots) == 0:
+            return
+        last_ys = store.posn[slots, 1]
+        time = store.knock_back_time[slots]
+        knock_x = self.look_up_all(time, "knock back x", self.knock_back_constant_x)
+        knock_y = self.look_up_all(time, "knock back y", self.knock_back_constant_y)
+
+        # the same as apply_knock_back for every unit
+        store.y_dir[slots[knock_y == self.knock_back_constant_y * self.knock_back_constant_y]] = DOWN
+        free = ~store.knock_back_blocked[slots]
+        left = free & (store.knock_dir[slots] == LEFT)
+        right = free & (store.knock_dir[slots] == RIGHT)
+        store.posn[slots[left], 0] = store.x_base[slots[left]] - knock_x[left]
+        store.posn[slots[right], 0] = store.x_base[slots[right]] + knock_x[right]
+        store.posn[slots, 1] = store.y_base[slots] - knock_y
+        store.update_rects(slots)
+        store.knock_back_time[slots] += 1
+
+        self.check_all_platform_collision(slots, last_ys)
+
+    # checks to see if the passed in units hit into a platform from the side
+    def blockage_step(self, units):
+        slots, others = self.split(units)
+        Physics.blockage_step(self, others)
+        for units, platforms in self.get_collisions(slots):
+            self.adjust_all_for_blockage(slots[units], platforms)
 
 
 # player class to represent the player
-class Player(pygame.sprite.Sprite):
+class Player(Entity):
+
+    __slots__ = ("posn", "last_posn", "rect", "color", "direction", "motion", "HP", "gravity_time",
+                 "knock_back_time", "y_base", "x_base", "free_fall", "jumping", "y_dir", "knock_dir",
+                 "immortality", "knock_back_blocked", "immortality_count")
 
     WIDTH = 50
     HEIGHT = 50
-    posn = [(size[0] / 2) - (WIDTH / 2), 0] #size[1] - HEIGHT - Rules.floor_height]
-    gravity_time = 0
-    knock_back_time = 0
+    start_posn = [(size[0] / 2) - (WIDTH / 2), 0] #size[1] - HEIGHT - Rules.floor_height]
     knock_length = 4
-    HP = Rules.player_hp
     max_jump = 64
-    y_base = posn[1]
-    x_base = posn[0]
-    free_fall = False
-    jumping = False
-    y_dir = "down"
-    knock_dir = None
     speed = 4
-    immortality = False
-    knock_back_blocked = False
-    immortality_count = 0
 
     def __init__(self):
-        pygame.sprite.Sprite.__init__(self, groups.players, groups.gravity_units)
+        Entity.__init__(self, groups.players, groups.gravity_units)
+
+        # every player gets its own copy of the starting position so that it is never moved for the next player
+        self.posn = list(Player.start_posn)
         self.direction = "right"
         self.motion = False
         self.color = BLACK
-        self.rect = None
+        self.HP = Rules.player_hp
+        self.gravity_time = 0
+        self.knock_back_time = 0
+        self.y_base = self.posn[1]
+        self.x_base = self.posn[0]
+        self.free_fall = False
+        self.jumping = False
+        self.y_dir = "down"
+        self.knock_dir = None
+        self.immortality = False
+        self.knock_back_blocked = False
+        self.immortality_count = 0
+        self.rect = pygame.Rect(0, 0, self.WIDTH, self.HEIGHT)
         self.update_rect()
 
-    # draws the player onto the surface
-    def draw_player(self, surface):
+        # where the player was at the start of the last tick
+        self.last_posn = list(self.posn)
+
+    # draws the player onto the surface and returns the area of the screen it takes up,
+    # the offset is the position of the camera and alpha is used for interpolation
+    def draw_player(self, surface, offset, alpha):
+        posn = interpolate(self.last_posn, self.posn, alpha)
+        area = pygame.Rect(int(round(posn[0] + offset)), int(round(posn[1])), self.WIDTH, self.HEIGHT)
+
         # creates a blinking affect if the player was hit
         if self.immortality:
             if not self.immortality_count % 6 == 0:
-                return
-        pygame.draw.rect(surface, self.color, self.posn + [self.WIDTH, self.HEIGHT])
+                return area
+        pygame.draw.rect(surface, self.color, area)
         if Rules.debug_mode:
-            pygame.draw.rect(surface, self.color, self.rect, 1)
+            pygame.draw.rect(surface, self.color, self.rect.move(int(round(offset)), 0), 1)
+        return area
 
     # keeps the player within the bounds of the screen
     def confine_player(self):
-        if self.posn[0] < 0:
-            self.posn[0] = 0
+        if groups.screen.to_screen(self.posn[0]) < 0:
+            self.posn[0] = -groups.world_posn[0]
             self.motion = False
 
-        elif self.posn[0] > size[0] - self.WIDTH:
-            self.posn[0] = size[0] - self.WIDTH
+        elif groups.screen.to_screen(self.posn[0]) > size[0] - self.WIDTH:
+            self.posn[0] = size[0] - self.WIDTH - groups.world_posn[0]
             self.motion = False
 
     # moves the player based on the players direction
@@ -461,14 +896,14 @@ class Player(pygame.sprite.Sprite):
 
         self.update_rect()
 
-    # updates the players rect
+    # updates the players rect, the rect is moved instead of being made again
     def update_rect(self):
-        self.rect = pygame.Rect(self.posn + [self.WIDTH, self.HEIGHT])
+        self.rect.topleft = self.posn
 
     def check_for_enemy_collision(self):
 
         # checks for collision between the player and an enemy
-        collision = pygame.sprite.spritecollide(self, groups.enemies.sprites(), False)
+        collision = groups.unit_grid.collide(self.rect)
         if len(collision) > 0 and not self.immortality:
             self.immortality = True
             self.HP -= collision[0].strength
@@ -487,8 +922,9 @@ class Player(pygame.sprite.Sprite):
 
     # updates the player
     def update(self):
-        # constantly update the x_base to where the player is currently placed
-        self.x_base = self.posn[0]
+        # constantly update the x_base to where the player is currently placed on the
+        # screen, the knock back is measured from here since the screen scrolls with it
+        self.x_base = groups.screen.to_screen(self.posn[0])
 
         # keep track of how long the player has been 'immortal'
         if self.immortality:
@@ -518,10 +954,9 @@ class Player(pygame.sprite.Sprite):
     def print_stats(self):
 
         floor = None
-        platforms = groups.platforms.sprites()
-        for platform in platforms:
-            if platform.ptype == "FloorPlatform":
-                floor = platform
+        floors = groups.platform_store.find_type("FloorPlatform")
+        if floors:
+            floor = groups.platform_store.get_sprite(floors[-1], groups)
 
         # helpful to see the most important attributes when fixing a bug
         print "---------------------------------------------"
@@ -535,38 +970,68 @@ class Player(pygame.sprite.Sprite):
         print "x: " + str(self.posn[0])
         print "y: " + str(self.posn[1])
         print "World posn: " + str(groups.world_posn[0])
-        print "Floor posn: " + str(floor.rect[0])
+        print "Floor posn: " + str(groups.screen.to_screen(floor.rect[0]))
         print "---------------------------------------------"
 
 
+# player whose position and physics are kept in a unit store, used with the batched physics engine
+class ArrayPlayer(ArrayUnit, Player):
+
+    __slots__ = ("store", "slot")
+
+    def __init__(self, store):
+        self.store = store
+        self.slot = store.allocate(self, False)
+        Player.__init__(self)
+
+
 # class to represent a bullet
-class Bullet(pygame.sprite.Sprite):
+class Bullet(Entity):
 
-    def __init__(self, player, direction):
-        pygame.sprite.Sprite.__init__(self, groups.bullets, groups.scrolling_units)
+    __slots__ = ("direction", "posn", "last_posn", "rect")
+
+    speed = 5
+    HEIGHT = 3
+    WIDTH = 6
+    strength = 1
+
+    # bullets are created ahead of time by the bullet pool and only join the game once they are spawned
+    def __init__(self):
+        Entity.__init__(self)
+        self.direction = None
+        self.posn = [0, 0]
+        self.last_posn = [0, 0]
+        self.rect = pygame.Rect(0, 0, self.WIDTH, self.HEIGHT)
+
+    # fires the bullet from the player in the passed in direction
+    def spawn(self, player, direction):
         self.direction = direction
         if direction == "right":
-            self.posn = [player.posn[0] + player.WIDTH,
-                         player.posn[1] + (player.HEIGHT / 2)]
+            self.posn[0] = player.posn[0] + player.WIDTH
         elif direction == "left":
-            self.posn = [player.posn[0],
-                         player.posn[1] + (player.HEIGHT / 2)]
-        self.speed = 5
-        self.HEIGHT = 3
-        self.WIDTH = 6
-        self.rect = None
-        self.strength = 1
-
-    # updates the bullets rect
+            self.posn[0] = player.posn[0]
+        self.posn[1] = player.posn[1] + (player.HEIGHT / 2)
+        self.last_posn[0] = self.posn[0]
+        self.last_posn[1] = self.posn[1]
+        self.add(groups.bullets)
+
+    # kills the bullet and puts it back into the bullet pool
+    def kill(self):
+        if self.alive():
+            Entity.kill(self)
+            if groups.bullet_pool is not None:
+                groups.bullet_pool.release(self)
+
+    # updates the bullets rect, the rect is moved instead of being made again
     def update_rect(self):
-        self.rect = pygame.Rect(self.posn + [self.WIDTH, self.HEIGHT])
+        self.rect.topleft = self.posn
 
     # updates the bullet
     def update(self):
         self.update_rect()
 
         # if the bullet is off the screen, kill the bullet
-        if self.posn[0] < 0 or self.posn[0] > size[0]:
+        if groups.screen.to_screen(self.posn[0]) < 0 or groups.screen.to_screen(self.posn[0]) > size[0]:
             self.kill()
 
         if self.direction == "right":
@@ -579,81 +1044,112 @@ class Bullet(pygame.sprite.Sprite):
         else:
             pass
 
-        # check to see if the bullet collided with an enemy and decrease the enemy's HP
-        enemies_hit = pygame.sprite.spritecollide(self, groups.enemies.sprites(), False)
-        for enemy in enemies_hit:
-            enemy.HP -= self.strength
-            enemy.color = (enemy.color[0] + 10, enemy.color[1] + 10, enemy.color[2] + 10)
-
-        # if the bullet hit an enemy, kill the bullet
-        if len(enemies_hit) > 0:
-            self.kill()
-
-    # draws the bullet on the surface
-    def draw_bullet(self, surface):
-        pygame.draw.rect(surface, BLACK, self.posn + [self.WIDTH, self.HEIGHT])
+    # decreases the enemy's HP and kills the bullet when the bullet hits the enemy,
+    # the enemy gets lighter with every hit until it is white
+    def hit(self, enemy):
+        enemy.HP -= self.strength
+        color = (enemy.color[0] + 10, enemy.color[1] + 10, enemy.color[2] + 10)
+        if max(color) > 255:
+            color = (255, 255, 255)
+        enemy.color = color
+        self.kill()
+
+    # adds the bullet's surface from the sprite cache to the batch of blits for the passed in surface and returns
+    # the area of the screen it takes up, the offset is the position of the camera and alpha is used for interpolation
+    def draw_bullet(self, batch, sprite_cache, surface, offset, alpha):
+        posn = interpolate(self.last_posn, self.posn, alpha)
+        area = pygame.Rect(int(round(posn[0] + offset)), int(round(posn[1])), self.WIDTH, self.HEIGHT)
+        batch.append((sprite_cache.get("rect", (self.WIDTH, self.HEIGHT), BLACK, surface), area))
+        return area
 
 
 # class to represent an enemy
-class Enemy(pygame.sprite.Sprite):
+class Enemy(Entity):
+
+    __slots__ = ("posn", "last_posn", "rect", "color", "player", "direction", "motion", "HP", "gravity_time",
+                 "knock_back_time", "y_base", "x_base", "free_fall", "jumping", "y_dir", "knock_dir",
+                 "immortality", "knock_back_blocked", "immortality_count")
 
     RADIUS = 25
     HEIGHT = RADIUS * 2
-    HP = 10
-    direction = None
+    FULL_HP = 10
     jump_speed = 5
-    gravity_time = 0
-    motion = False
     strength = 1
 
     WIDTH = RADIUS * 2
-    # knock_back_time = 0
-    # knock_length = 4
 
     max_jump = 64
 
-    free_fall = False
-    jumping = False
-    y_dir = "down"
-    knock_dir = None
-    # speed = 4
-
-    knock_back_time = 0
     knock_length = 4
 
     speed = 4
-    immortality = False
-    knock_back_blocked = False
-    immortality_count = 0
 
+    # enemies are created ahead of time by the enemy pool and only join the game once they are spawned
     def __init__(self):
-        pygame.sprite.Sprite.__init__(self, groups.enemies, groups.gravity_units, groups.scrolling_units)
+        Entity.__init__(self)
+        self.player = None
+        self.posn = [0, 0]
+        self.last_posn = [0, 0]
+        self.rect = pygame.Rect(0, 0, self.WIDTH, self.HEIGHT)
+        self.reset()
+
+    # puts everything that changes during the enemy's life back to how it was when it was created
+    def reset(self):
         self.color = (100, 100, 100)
+        self.HP = Enemy.FULL_HP
+        self.direction = None
+        self.gravity_time = 0
+        self.motion = False
+        self.free_fall = False
+        self.jumping = False
+        self.y_dir = "down"
+        self.knock_dir = None
+        self.knock_back_time = 0
+        self.immortality = False
+        self.knock_back_blocked = False
+        self.immortality_count = 0
+
+    # spawns the enemy somewhere on the screen that is not too close to the player
+    def spawn(self):
+        self.reset()
+        self.add(groups.enemies, groups.gravity_units)
         self.player = groups.players.sprites()[0]
 
         # this block of code is attempting to generate a spawn position that is fair to the player
         fair_spawn = False
         while not fair_spawn:
-            self.posn = [random.randint(0, size[0]), self.HEIGHT] #size[1] - self.HEIGHT - Rules.floor_height - 100] # size[1] - 425] # size[1] - self.RADIUS]
+            self.posn = [random.randint(0, size[0]) - groups.world_posn[0], self.HEIGHT] #size[1] - self.HEIGHT - Rules.floor_height - 100] # size[1] - 425] # size[1] - self.RADIUS]
             if abs(self.player.posn[0] - self.posn[0]) > Rules.spawn_distance:
                 fair_spawn = True
             else:
                 pass
+        self.last_posn = list(self.posn)
         self.y_base = self.posn[1]
         self.x_base = self.posn[0]
-        self.rect = None
         self.update_rect()
 
-    # draws the enemy onto the surface
-    def draw_enemy(self, surface):
-        for number in self.color:
-            if number > 255:
-                self.color = (255, 255, 255)
-                break
-        pygame.draw.circle(surface, self.color, [self.posn[0] + self.RADIUS, self.posn[1] + self.RADIUS], self.RADIUS)
-        pygame.draw.circle(surface, BLACK, [self.posn[0] + self.RADIUS, self.posn[1] + self.RADIUS], self.RADIUS, 1)
-        if Rules.debug_mode:
-            pygame.draw.rect(surface, BLACK, self.rect, 4)
+        # enemies that spawn during a tick have to be collided with during that tick
+        if groups.unit_grid is not None:
+            groups.unit_grid.insert(self)
+
+    # kills the enemy and puts it back into the enemy pool
+    def kill(self):
+        if self.alive():
+            Entity.kill(self)
+            if groups.enemy_pool is not None:
+                groups.enemy_pool.release(self)
+
+    # adds the enemy's surface from the sprite cache to the batch of blits for the passed in surface and returns
+    # the area of the screen it takes up, the offset is the position of the camera and alpha is used for interpolation
+    def draw_enemy(self, batch, sprite_cache, surface, offset, alpha):
+        posn = interpolate(self.last_posn, self.posn, alpha)
+        area = pygame.Rect(int(round(posn[0] + offset)), int(round(posn[1])), self.WIDTH, self.HEIGHT)
+        batch.append((sprite_cache.get("outlined circle", (self.WIDTH, self.HEIGHT), self.color, surface), area))
+        return area
+
+    # draws the outline of the enemy's rect, used in debug mode
+    def draw_outline(self, surface, offset):
+        pygame.draw.rect(surface, BLACK, self.rect.move(int(round(offset)), 0), 4)
 
     # moves the enemy based on the enemys direction
     def move_enemy(self):
@@ -672,9 +1168,9 @@ class Enemy(pygame.sprite.Sprite):
         if self.posn[1] > size[1] - Rules.floor_height:
             self.kill()
 
-    # updates the rect of the enemy
+    # updates the rect of the enemy, the rect is moved instead of being made again
     def update_rect(self):
-        self.rect = pygame.Rect(self.posn + [self.WIDTH, self.HEIGHT])
+        self.rect.topleft = self.posn
 
     # updates the enemy
     def update(self):
@@ -714,63 +1210,268 @@ class Enemy(pygame.sprite.Sprite):
             print "y: " + str(self.posn[1])
             print "---------------------------------------------"
 
+
+# enemy whose position and physics are kept in a unit store, used with the batched physics engine
+class ArrayEnemy(ArrayUnit, Enemy):
+
+    __slots__ = ("store", "slot")
+
+    def __init__(self, store):
+        self.store = store
+        self.slot = store.allocate(self, True)
+        Enemy.__init__(self)
+
+    # kills the enemy and puts it back into the enemy pool, if the pool is full the enemy's slot is given back
+    def kill(self):
+        if self.alive():
+            Entity.kill(self)
+            if groups.enemy_pool is None or not groups.enemy_pool.release(self):
+                self.store.release(self.slot)
+
+
+# group of enemies that are kept in a unit store, every enemy in the group is updated at once
+class ArrayEnemyGroup(EntityGroup):
+
+    def __init__(self, store):
+        EntityGroup.__init__(self)
+        self.store = store
+
+    # does the same as Enemy.update for every enemy in the group
+    def update(self):
+        enemies = self.sprites()
+        if len(enemies) == 0:
+            return
+        store = self.store
+        slots = store.get_slots(enemies)
+        x = store.posn[slots, 0]
+        store.x_base[slots] = x
+
+        # turn towards the player and move
+        player_x = enemies[0].player.posn[0]
+        direction = store.direction[slots]
+        direction[x < player_x] = RIGHT
+        direction[x > player_x] = LEFT
+        store.direction[slots] = direction
+        store.posn[slots, 0] = x + numpy.where(direction == RIGHT, 1, numpy.where(direction == LEFT, -1, 0))
+        store.update_rects(slots)
+
+        # kill the enemies whose HP is less than zero and the ones that fell off the map
+        dead = (store.HP[slots] <= 0) | (store.posn[slots, 1] > size[1] - Rules.floor_height)
+        for index in numpy.flatnonzero(dead).tolist():
+            enemies[index].kill()
+
+
 class StartGame:
 
     # Used for debugging
     display = False
 
-    def __init__(self):
-        self.current_level = self.load_level(sys.argv[1])
+    # How far past the edges of the screen units are still drawn, see draw_bullets
+    cull_margin = 128
+
+    # when headless is True the game is ran without a window, it can only be updated and not drawn,
+    # the seed is used for the random numbers (a random one is picked if it is None), the key
+    # events are recorded into the file with the name passed in as record if it isn't None and
+    # a trace of every frame is written to the file with the name passed in as trace if it isn't None
+    def __init__(self, level_name, headless=False, seed=None, record=None, trace=None):
+        self.current_level = self.load_level(level_name)
+
+        # seeding the random numbers makes the enemies spawn in the same places when a session is replayed
+        if seed is None:
+            seed = random.randrange(2 ** 31)
+        self.seed = seed
+        random.seed(seed)
+        if record is not None:
+            self.recorder = InputRecorder(record, seed)
+        else:
+            self.recorder = None
+
+        # the dummy video driver lets pygame start up on machines that have no display
+        if headless:
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
         pygame.init()
         self.clock = pygame.time.Clock()
-        self.surface = pygame.display.set_mode(size)
-        self.player = Player()
+        if headless:
+            self.surface = None
+        else:
+            self.surface = pygame.display.set_mode(size)
+
+        # the numpy physics engine keeps the player and the enemies in a unit store so that they can be moved at once
+        if Rules.physics_backend == "numpy" and numpy is not None:
+            self.unit_store = UnitStore(Rules.enemy_pool_size + 1)
+            groups.enemies = ArrayEnemyGroup(self.unit_store)
+            self.player = ArrayPlayer(self.unit_store)
+        else:
+            if Rules.physics_backend == "numpy":
+                print "numpy is not installed, using the scalar physics engine instead"
+            self.unit_store = None
+            self.player = Player()
         self.spawn = 0
         self.killed = 0
-        self.physics = Physics()
+
+        # bullets and enemies are used again after they die instead of being created every time
+        groups.bullet_pool = Pool(Bullet, Rules.bullet_pool_size)
+        groups.enemy_pool = Pool(self.create_enemy, Rules.enemy_pool_size)
+
+        # how many ticks the game has been updated for
+        self.ticks = 0
+        if self.unit_store is not None:
+            self.physics = BatchedPhysics(self.unit_store)
+        else:
+            self.physics = Physics()
         self.platforms = self.load_platforms()
 
+        # the background and platforms never change so they can be baked in chunks the size of the screen
+        self.static_layer = StaticLayer(groups.platform_grid, self.current_level.rules["background-color"],
+                                        size, Rules.prerendered_chunks)
+
+        # the shapes that units and platforms are drawn with are drawn once and then blitted
+        self.sprite_cache = SpriteCache(Rules.sprite_cache_size, size)
+
+        # counts how many draws were skipped in the last frame because they were off of the screen
+        self.culled_draws = 0
+
+        # keeps track of what changed on the screen and where the camera was in the last frame
+        self.dirty_rects = DirtyRects()
+        self.last_drawn_offset = None
+
+        # fonts and rendered text are kept between frames instead of being made again every frame
+        self.text_cache = TextCache(Rules.text_cache_size)
+        self.hud = Hud(self.text_cache, (size[0] + size[1]) / 48, BLACK, (10, 10))
+
+        # times each part of a frame while it is turned on, the results are shown in the top right corner
+        self.profiler = FrameProfiler(Rules.profiled_frames)
+        self.profile_overlay = Hud(self.text_cache, (size[0] + size[1]) / 60, BLACK, (size[0] - 240, 10))
+
+        # the parts of the physics engine and the collision checks are wrapped while tracing so
+        # that the game doesn't pay anything for the trace when it isn't being traced, platform
+        # checks are counted in the physics engine since the platform grid is also used for drawing
+        if trace is not None:
+            self.trace = TraceWriter(trace)
+            self.profiler.trace = self.trace
+            self.profiler.always_time = True
+            for step in ("gravity_step", "knock_back_step", "blockage_step"):
+                setattr(self.physics, step, self.trace.wrap(step, "physics", getattr(self.physics, step)))
+            for check in ("check_for_blockage", "check_platform_collision"):
+                setattr(self.physics, check, self.trace.count("platforms", getattr(self.physics, check)))
+
+            # the batched physics engine checks every enemy at once, so those checks are counted on their own
+            if self.unit_store is not None:
+                self.physics.get_collisions = self.trace.count("platform batches", self.physics.get_collisions)
+            groups.unit_grid.collide = self.trace.count("units", groups.unit_grid.collide)
+        else:
+            self.trace = None
+
+        # everything made while loading lives until the game ends, so from here on the garbage
+        # collector only runs between frames
+        if Rules.manual_gc:
+            self.gc_control = GcControl(Rules.frame_budget, Rules.gc_max_skipped_frames, Rules.debug_mode)
+            self.gc_control.start()
+        else:
+            self.gc_control = None
+
+        # the watchdog needs every frame to be timed so that it can tell which ones are slow
+        if Rules.watchdog:
+            self.watchdog = Watchdog(Rules.watchdog_dir, Rules.frame_budget, Rules.watchdog_snapshots,
+                                     Rules.watchdog_profile_frames, Rules.watchdog_cooldown, self.get_state)
+            self.profiler.always_time = True
+        else:
+            self.watchdog = None
+
+        # where the camera was at the start of the last tick, used for interpolation
+        self.last_offset = groups.world_posn[0]
+
+    # loads the level with the passed in name from the levels folder, if
+    # the name has a file extension it is used as the path to the level
     def load_level(self, level_name):
 
         global world_size
 
-        with open("levels/{}.stg".format(level_name)) as filename:
-            level = json.load(filename)
+        # a level can be a .stg file, a compiled .stgb file or a directory holding a chunked level,
+        # a name without an extension is looked for in the levels directory
+        if os.path.splitext(level_name)[1] == "" and not os.path.isdir(level_name):
+            if os.path.isdir("levels/{}".format(level_name)):
+                level_name = "levels/{}".format(level_name)
+            elif os.path.exists("levels/{}.stgb".format(level_name)) and not os.path.exists("levels/{}.stg".format(level_name)):
+                level_name = "levels/{}.stgb".format(level_name)
+            else:
+                level_name = "levels/{}.stg".format(level_name)
+
+        if os.path.isdir(level_name):
+            level = ChunkedLevel(level_name)
+        elif os.path.splitext(level_name)[1] == ".stgb":
+            level = CompiledLevel(level_name)
+        elif Rules.level_cache:
+            try:
+                level = LevelCache(Rules.level_cache_dir, Rules.level_cache_entries).load(level_name)
+            except (IOError, OSError) as error:
+                print "Could not use the level cache ({}), loading the level without it".format(error)
+                level = JsonLevel(level_name)
+        else:
+            level = JsonLevel(level_name)
 
-        world_size = level["rules"]["world-size"]
+        world_size = level.rules["world-size"]
 
         return level
 
     # loads all platforms into the game
     def load_platforms(self):
 
-        platforms = []
-
-        # if in the rules, platforms_exist is false, these platforms
-        # will not be generated. Otherwise all platforms that appear
-        # in the game can be added into this platforms list
+        platforms = PlatformStore()
+        groups.platform_store = platforms
+        groups.platform_grid = PlatformGrid(Rules.grid_cell_size, platforms)
+        if self.unit_store is not None:
+            groups.unit_grid = ArrayUnitGrid(Rules.unit_grid_cell_size, self.unit_store)
+        else:
+            groups.unit_grid = UnitGrid(Rules.unit_grid_cell_size)
+        groups.ground_index = GroundIndex()
 
-        for row in self.current_level["platforms"]:
-            if Rules.platforms_exist or row["type"] == "FloorPlatform":
-                platforms.append(
-                    Platform(groups, (row["x"], row["y"]), row["type"], row["width"], row["height"], row["color"])
-                )
-            else:
-                pass
+        # the platforms are loaded a chunk at a time as the screen gets close to them, a .stg
+        # file is a single chunk so all of its platforms are loaded right away
+        self.level_streamer = LevelStreamer(self.current_level, platforms, groups.platform_grid, groups.ground_index,
+                                            self.keep_platform, Rules.stream_margin, Rules.max_level_chunks,
+                                            Rules.chunk_loads_per_tick)
+        left = -groups.world_posn[0]
+        self.level_streamer.update(left, left + size[0], limit=False)
 
         return platforms
 
+    # returns True if platforms of the passed in type should be loaded into the game
+    def keep_platform(self, ptype):
+        # if in the rules, platforms_exist is false, these platforms
+        # will not be generated. Otherwise all platforms that appear
+        # in the game can be added into the platform store
+        return Rules.platforms_exist or ptype == "FloorPlatform"
+
+    # loads the chunks of the level that the screen is getting close to and unloads the ones far away from it
+    def stream_level(self):
+        left = -groups.world_posn[0]
+        if self.unit_store is not None:
+            units = self.unit_store.get_spans(groups.gravity_units.sprites(), 2 * UNIT_MARGIN)
+        else:
+            units = [(unit.posn[0], unit.posn[0] + unit.WIDTH) for unit in groups.gravity_units]
+        for bounds in self.level_streamer.update(left, left + size[0], units):
+            # anything baked where platforms were loaded or unloaded has to be baked again
+            self.static_layer.invalidate(bounds)
+
     # takes in a key press event and responds to it
     def evaluate_keypress(self, event):
 
+        if self.recorder is not None:
+            self.recorder.record(self.ticks, event)
+
         # if the player presses the 'a' key, then generate a bullet
         if event.key == pygame.K_a:
-            Bullet(self.player, self.player.direction)
+            groups.bullet_pool.acquire().spawn(self.player, self.player.direction)
 
         # used for debugging, lets you print out your stats. could be a game feature later
         elif event.type == pygame.KEYDOWN and event.key == pygame.K_s and Rules.debug_mode:
             self.display = True
 
+        # also for debugging, turns the frame profiler and its overlay on and off
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_p and Rules.debug_mode:
+            self.profiler.toggle()
+
         # sets the players direction and motion boolean based on which arrow key was pressed
         elif event.key == pygame.K_RIGHT and event.type == pygame.KEYDOWN:
             self.player.motion = True
@@ -793,115 +1494,425 @@ class StartGame:
         else:
             pass
 
-    # draws all the bullets
-    def draw_bullets(self):
+    # draws all the bullets that are on the screen, units are culled by where they are at the
+    # end of the tick so the viewport is padded by how far they could be drawn behind that
+    def draw_bullets(self, offset, alpha):
+        viewport = groups.screen.get_viewport(int(round(offset))).inflate(self.cull_margin, self.cull_margin)
+        batch = []
         for bullet in groups.bullets.sprites():
-            bullet.draw_bullet(self.surface)
+            # the bullet's rect is a step behind since it is updated before the bullet moves
+            if viewport.left - bullet.WIDTH < bullet.posn[0] < viewport.right \
+                    and viewport.top - bullet.HEIGHT < bullet.posn[1] < viewport.bottom:
+                area = bullet.draw_bullet(batch, self.sprite_cache, self.surface, offset, alpha)
+                if Rules.dirty_rect_updates:
+                    self.dirty_rects.add(area)
+            else:
+                self.culled_draws += 1
+        blit_batch(self.surface, batch)
+
+    # draws all the enemies that are on the screen
+    def draw_enemies(self, offset, alpha):
+        viewport = groups.screen.get_viewport(int(round(offset))).inflate(self.cull_margin, self.cull_margin)
+        batch = []
+        enemies = groups.enemies.sprites()
+
+        # the unit store checks every enemy against the screen at once
+        if self.unit_store is not None:
+            visible = self.unit_store.colliding(enemies, viewport)
+        else:
+            visible = [enemy for enemy in enemies if viewport.colliderect(enemy.rect)]
+        self.culled_draws += len(enemies) - len(visible)
 
-    # draws all the enemies
-    def draw_enemies(self):
-        for enemy in groups.enemies.sprites():
-            enemy.draw_enemy(self.surface)
+        for enemy in visible:
+            area = enemy.draw_enemy(batch, self.sprite_cache, self.surface, offset, alpha)
 
-    # draws all platforms
-    def draw_platforms(self):
-        for platform in groups.platforms.sprites():
-            platform.draw_platform(self.surface)
+            # the outline drawn in debug mode goes slightly past the enemy's area
+            if Rules.dirty_rect_updates:
+                self.dirty_rects.add(area.inflate(8, 8))
+        blit_batch(self.surface, batch)
+
+        # the outlines are drawn over all of the enemies instead of each one over its own enemy
+        if Rules.debug_mode:
+            for enemy in visible:
+                enemy.draw_outline(self.surface, offset)
+
+    # draws all platforms that are on the screen, the platform grid is used
+    # to find them so that the platforms off of the screen are never looked at
+    def draw_platforms(self, offset):
+        visible = groups.platform_grid.collide(groups.screen.get_viewport(offset))
+        groups.platform_store.draw_platforms(visible, self.surface, offset, self.sprite_cache)
+        self.culled_draws += len(groups.platform_store) - len(visible)
 
     # returns True if the player is alive
     def player_is_alive(self):
         return len(groups.players.sprites()) > 0
 
+    # returns a new enemy for the enemy pool, kept in the unit store if there is one
+    def create_enemy(self):
+        if self.unit_store is not None:
+            return ArrayEnemy(self.unit_store)
+        return Enemy()
+
     # spawns the enemy at the specified spawn rate in Rules
     def spawn_enemy(self):
         if not len(groups.enemies.sprites()) >= Rules.spawn_count:
             if self.spawn == Rules.spawn_rate * Rules.clock_tick:
-                Enemy()
+                groups.enemy_pool.acquire().spawn()
                 self.spawn = 0
             else:
                 self.spawn += 1
 
     # displays the game over screen
     def display_game_over(self):
-        font = pygame.font.SysFont("monospace", ((size[0] + size[1]) / 18))
-        label = font.render("GAME OVER", 1, BLACK)
+        font_size = (size[0] + size[1]) / 18
+        label = self.text_cache.render("GAME OVER", font_size, BLACK)
         self.surface.blit(label, (size[0] / 4, size[0] / 6))
-        score = font.render("SCORE:%d" % self.killed, 1, (0, 0, 0))
+        score = self.text_cache.render("SCORE:%d" % self.killed, font_size, (0, 0, 0))
         self.surface.blit(score, (size[0] / 3, size[0] / 4))
 
-    # runs the main game engine
-    def run_engine(self):
+    # draws the heads up display, the text is only rendered again when a value changes
+    def draw_hud(self):
+        self.hud.set("HP", self.player.HP)
+        self.hud.set("KILLS", self.killed)
+        self.hud.set("FPS", int(round(self.clock.get_fps())))
+        area = self.hud.draw(self.surface)
+        if Rules.dirty_rect_updates:
+            self.dirty_rects.add(area)
+
+    # returns the state of the game that goes into the watchdog's snapshots of slow frames
+    def get_state(self):
+        return {
+            "tick": self.ticks,
+            "fps": self.clock.get_fps(),
+            "world_posn": list(groups.world_posn),
+            "player_posn": list(self.player.posn),
+            "player_hp": self.player.HP,
+            "enemies": len(groups.enemies),
+            "bullets": len(groups.bullets),
+            "platforms": len(groups.platform_store),
+            "chunks": len(self.level_streamer.loaded)
+        }
+
+    # writes how many units and platforms there are and how many collision checks
+    # were made since the last frame to the counter tracks of the trace
+    def trace_counts(self):
+        self.trace.add_counter("units", {"enemies": len(groups.enemies), "bullets": len(groups.bullets)})
+        self.trace.add_counter("platforms", {"loaded": len(groups.platform_store)})
+        self.trace.add_counter("collision checks", self.trace.take_calls())
+
+    # draws how long each part of a frame took on average over the last few frames
+    # along with how many units and platforms there are
+    def draw_profile(self):
+        overlay = self.profile_overlay
+        averages = self.profiler.get_averages()
+        overlay.set("FPS", "{:.1f}".format(self.clock.get_fps()))
+        for phase in PHASES:
+            overlay.set(phase.upper(), "{:.2f} ms".format(averages[phase]))
+        overlay.set("ENEMY COUNT", len(groups.enemies))
+        overlay.set("BULLET COUNT", len(groups.bullets))
+        overlay.set("PLATFORM COUNT", len(groups.platform_store))
+        if self.gc_control is not None and self.gc_control.measure:
+            overlay.set("LIVE CHANGE", "{:+d} {}".format(self.gc_control.live_change, self.gc_control.live_unit))
+        area = overlay.draw(self.surface)
+        if Rules.dirty_rect_updates:
+            self.dirty_rects.add(area)
+
+    # remembers where every moving unit and the camera are at the start of a tick
+    def remember_positions(self):
+        if self.unit_store is not None:
+            self.unit_store.remember_positions(groups.gravity_units.sprites())
+            unit_groups = (groups.bullets,)
+        else:
+            unit_groups = (groups.players, groups.bullets, groups.enemies)
+        for units in unit_groups:
+            for unit in units.sprites():
+                unit.last_posn[0] = unit.posn[0]
+                unit.last_posn[1] = unit.posn[1]
+        self.last_offset = groups.world_posn[0]
+
+    # puts every enemy into the unit grid
+    def fill_unit_grid(self):
+        groups.unit_grid.fill(groups.enemies.sprites())
+
+    # checks every one of the passed in bullets for collision with the enemies
+    def check_for_bullet_hits(self, bullets):
+        for bullet, enemy in groups.unit_grid.collide_all(bullets):
+            bullet.hit(enemy)
+
+    # updates everything in the game by one tick
+    def update_world(self):
+
+        profiler = self.profiler
+
+        self.remember_positions()
+        self.ticks += 1
+
+        self.stream_level()
+
+        # the enemies don't move until they are updated, so they are put into the grid once
+        # here and the bullets and the player only have to check the enemies near them
+        self.fill_unit_grid()
+        profiler.mark("streaming")
+
+        # the bullets that are killed for going off of the screen can still hit an enemy on this tick,
+        # the group's list doesn't have to be copied since killing a bullet only marks the group and
+        # no bullets are added until the next tick
+        bullets = groups.bullets.sprites()
+        groups.bullets.update()
+        self.check_for_bullet_hits(bullets)
+        profiler.mark("bullets")
+
+        # spawn the enemy at the specified spawn rate in Rules
+        self.spawn_enemy()
+        profiler.mark("spawning")
+
+        groups.players.update()
+        profiler.mark("player")
+
+        # enemies die when they are updated, therefore keeping track
+        # of the enemy count before hand and after, lets you count
+        # how many enemies the player was able to kill before dying
+        enemies_before = len(groups.enemies.sprites())
+        groups.enemies.update()
+        enemies_after = len(groups.enemies.sprites())
+
+        # keep track of how many enemies were killed
+        self.killed += enemies_before - enemies_after
+        profiler.mark("enemies")
+
+        # The physics engine must update after all sprites that are dependent on it
+        # have been updated first, specifically because this engine accounts for
+        # all of the platform collision that occurs in the game
+        self.physics.update()
+        profiler.mark("physics")
+
+        # if display was set to True, print the player's stats, this can only
+        # happen if debug_mode in Rules is set to True and the user presses
+        # the 's' key when playing the game
+        if self.display:
+            self.player.print_stats()
+            print "Culled draws: " + str(self.culled_draws)
+            print "Bullet pool: " + groups.bullet_pool.get_stats()
+            print "Enemy pool: " + groups.enemy_pool.get_stats()
+            self.display = False
+
+    # draws everything in the game, alpha is how far along the game
+    # is from the last tick to the next one and is used for interpolation
+    def draw_world(self, alpha):
+
+        self.culled_draws = 0
+
+        # the camera is interpolated the same way as the units
+        offset = self.last_offset + (groups.world_posn[0] - self.last_offset) * alpha
+
+        # fill the background and draw the platforms, either from the baked
+        # chunks or one by one if prerender_platforms is False in Rules
+        if Rules.prerender_platforms:
+            self.static_layer.draw(self.surface, int(round(offset)))
+        else:
+            self.surface.fill(self.current_level.rules["background-color"])
+            self.draw_platforms(int(round(offset)))
+
+        # draw all necessary elements, the player's area is always marked as changed
+        # since the player might not be drawn when it is blinking
+        area = self.player.draw_player(self.surface, offset, alpha)
+        if Rules.dirty_rect_updates:
+            self.dirty_rects.add(area)
+        self.draw_bullets(offset, alpha)
+        self.draw_enemies(offset, alpha)
+
+        if Rules.show_hud:
+            self.draw_hud()
+        if self.profiler.enabled:
+            self.draw_profile()
+
+        # if the player is not alive, display the game over screen
+        if not self.player_is_alive():
+            self.display_game_over()
+            self.dirty_rects.add_everything()
+
+        # the whole screen changes when the camera moves
+        if int(round(offset)) != self.last_drawn_offset:
+            self.dirty_rects.add_everything()
+            self.last_drawn_offset = int(round(offset))
+
+    # sends the frame to the display, only sending the parts that
+    # changed if dirty_rect_updates is True in Rules
+    def update_display(self):
+        if Rules.dirty_rect_updates:
+            rects = self.dirty_rects.collect()
+            if rects is None:
+                pygame.display.update()
+            else:
+                pygame.display.update(rects)
+        else:
+            pygame.display.update()
+
+    # runs the main game engine, the game is updated in fixed ticks at the rate
+    # specified by clock_tick in Rules and drawn as often as frame_rate allows,
+    # if a script is passed in the key presses come from it instead of the keyboard
+    # and if uncapped is True the game is updated once every frame as fast as possible
+    def run_engine(self, script=None, uncapped=False):
+
+        tick_length = 1000.0 / Rules.clock_tick
+
+        # how much time has passed that the game has not been updated for yet
+        lag = 0.0
 
         done = False
         while not done:
-            # make the clock tick at the rate specified in Rules
-            self.clock.tick(Rules.clock_tick)
+            # wait until it is time for the next frame
+            if uncapped:
+                self.clock.tick()
+                lag = tick_length
+            else:
+                lag += self.clock.tick(Rules.frame_rate)
+            self.profiler.begin_frame()
+            if self.gc_control is not None:
+                self.gc_control.begin_frame()
 
             # wait for events and interpret them accordingly
             events = pygame.event.get()
             for event in events:
                 if event.type == pygame.QUIT:
                     done = True
-                elif event.type == pygame.KEYDOWN or event.type == pygame.KEYUP:
+                elif (event.type == pygame.KEYDOWN or event.type == pygame.KEYUP) and script is None:
                     self.evaluate_keypress(event)
                 # all other events are ignored so pass
                 else:
                     pass
+            self.profiler.mark("events")
+
+            # update the game once for every tick that has passed since the last frame
+            ticks = 0
+            while lag >= tick_length and ticks < Rules.max_ticks_per_frame:
+                # if the player is alive, update everything, otherwise nothing moves
+                if self.player_is_alive():
+                    if script is not None:
+                        for event in script.get_events(self.ticks):
+                            self.evaluate_keypress(event)
+                    self.update_world()
+                else:
+                    self.remember_positions()
+                lag -= tick_length
+                ticks += 1
 
-            # fill the background
-            self.surface.fill(self.current_level["rules"]["background-color"])
-
-            # draw all necessary elements
-            self.draw_platforms()
-            self.player.draw_player(self.surface)
-            self.draw_bullets()
-            self.draw_enemies()
-
-            # if the player is alive, update everything
-            if self.player_is_alive():
+            # the game is too far behind to catch up so let go of the time it couldn't
+            if ticks == Rules.max_ticks_per_frame:
+                lag = min(lag, tick_length)
 
-                groups.bullets.update()
+            if Rules.interpolate:
+                self.draw_world(min(lag / tick_length, 1.0))
+            else:
+                self.draw_world(1.0)
+            self.profiler.mark("drawing")
 
-                # spawn the enemy at the specified spawn rate in Rules
-                self.spawn_enemy()
+            # update the general display
+            self.update_display()
+            self.profiler.mark("display")
+            self.profiler.end_frame()
+            if self.trace is not None:
+                self.trace_counts()
+            if self.watchdog is not None:
+                self.watchdog.check(self.profiler.get_last())
+
+            # garbage is collected in the time left before the next frame
+            if self.gc_control is not None:
+                self.gc_control.end_frame()
 
-                groups.players.update()
+        # quit the game if the while loop is broken
+        if self.recorder is not None:
+            self.recorder.close(self.ticks)
+        if self.trace is not None:
+            self.trace.close()
+        if self.watchdog is not None:
+            self.watchdog.close()
+        if self.gc_control is not None:
+            self.gc_control.stop()
+        pygame.quit()
 
-                # enemies die when they are updated, therefore keeping track
-                # of the enemy count before hand and after, lets you count
-                # how many enemies the player was able to kill before dying
-                enemies_before = len(groups.enemies.sprites())
-                groups.enemies.update()
-                enemies_after = len(groups.enemies.sprites())
+    # updates the game for the passed in amount of ticks as fast as possible without drawing anything,
+    # key presses come from the passed in script, returns the ticks ran and the seconds it took
+    def run_headless(self, ticks, script):
 
-                # keep track of how many enemies were killed
-                self.killed += enemies_before - enemies_after
+        start = default_timer()
+        for tick in range(ticks):
+            # without frames every tick is treated as one
+            self.profiler.begin_frame()
+            if self.gc_control is not None:
+                self.gc_control.begin_frame()
 
-                # The physics engine must update after all sprites that are dependent on it
-                # have been updated first, specifically because this engine accounts for
-                # all of the platform collision that occurs in the game
-                self.physics.update()
+            for event in script.get_events(tick):
+                self.evaluate_keypress(event)
+            self.profiler.mark("events")
 
-                # if display was set to True, print the player's stats, this can only
-                # happen if debug_mode in Rules is set to True and the user presses
-                # the 's' key when playing the game
-                if self.display:
-                    self.player.print_stats()
-                    self.display = False
+            # there is nothing left to update once the player is dead
+            if not self.player_is_alive():
+                break
 
-            # if the player is not alive, display the game over screen
-            else:
-                self.display_game_over()
+            self.update_world()
+            self.profiler.end_frame()
+            if self.trace is not None:
+                self.trace_counts()
+            if self.gc_control is not None:
+                self.gc_control.end_frame()
+
+        elapsed = default_timer() - start
+        if self.recorder is not None:
+            self.recorder.close(self.ticks)
+        if self.trace is not None:
+            self.trace.close()
+        if self.watchdog is not None:
+            self.watchdog.close()
+        if self.gc_control is not None:
+            self.gc_control.stop()
+        pygame.quit()
 
-            # update the general display
-            pygame.display.update()
+        return self.ticks, elapsed
 
-        # quit the game if the while loop is broken
-        pygame.quit()
 
 # run the game if this is the first script that is ran
 if __name__ == "__main__":
-    # initialize the StartGame object
-    game = StartGame()
-    # run the engine to set the game in motion
-    game.run_engine()
+    parser = argparse.ArgumentParser(description="Runs the level with the passed in name from the levels folder")
+    parser.add_argument("level", help="the name of the level without the 'stg' file extension")
+    parser.add_argument("--headless", type=int, nargs="?", const=-1, metavar="TICKS",
+                        help="update the game for this many ticks without a window and report the ticks per second, "
+                             "when replaying the tick count can be left out to play the whole recording")
+    parser.add_argument("--script", help="a file of scripted key presses to use in headless mode")
+    parser.add_argument("--seed", type=int, help="the seed for the random numbers, picked at random by default")
+    parser.add_argument("--record", metavar="FILE", help="record the key presses and seed into a file")
+    parser.add_argument("--replay", metavar="FILE", help="replay the key presses and seed from a recorded file")
+    parser.add_argument("--uncapped", action="store_true",
+                        help="update the game once every frame as fast as possible instead of in real time")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write how long every part of every frame took into a file in the Chrome trace event format")
+    arguments = parser.parse_args()
+
+    # a replay is a script that has the seed of the recorded session
+    input_script = None
+    seed = arguments.seed
+    if arguments.replay is not None:
+        input_script = load_script(arguments.replay)
+        seed = input_script.seed
+    elif arguments.script is not None:
+        input_script = load_script(arguments.script)
+        if input_script.seed is not None and seed is None:
+            seed = input_script.seed
+
+    if arguments.headless is not None:
+        ticks = arguments.headless
+        if ticks == -1:
+            if input_script is None:
+                parser.error("--headless needs a tick count unless a script or replay is passed in")
+            ticks = input_script.get_length()
+        if input_script is None:
+            input_script = patrol_script(ticks)
+        game = StartGame(arguments.level, headless=True, seed=seed, record=arguments.record, trace=arguments.trace)
+        ticks_ran, seconds = game.run_headless(ticks, input_script)
+        print "{} ticks in {:.3f} seconds ({:.1f} ticks per second)".format(
+            ticks_ran, seconds, ticks_ran / seconds if seconds > 0 else float("inf"))
+    else:
+        # initialize the StartGame object
+        game = StartGame(arguments.level, seed=seed, record=arguments.record, trace=arguments.trace)
+        # run the engine to set the game in motion
+        game.run_engine(input_script, arguments.uncapped)
@@ -0,0 +1,89 @@
+import gc
+from timeit import default_timer
+
+# tracemalloc only exists in Python 3.4 and newer, without it the garbage collector's count
+# of the objects it tracks that were made since its last collection is used instead
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+# class to take the garbage collector out of the middle of frames, the automatic collector is turned off
+# once the level has loaded and garbage is only collected after a frame is done, as long as the frame
+# finished under its budget. It can also measure how much the live memory changed during each frame,
+# this is a net change so anything that is made and freed again in the same frame doesn't show up in it
+class GcControl:
+
+    def __init__(self, budget, max_skipped_frames, measure):
+        # how many milliseconds a frame can take and still leave time to collect garbage after it
+        self.budget = budget
+
+        # how many frames in a row can go over the budget before garbage is collected anyway
+        self.max_skipped_frames = max_skipped_frames
+        self.skipped_frames = 0
+
+        # True if the change in live memory of every frame is measured
+        self.measure = measure
+        if tracemalloc is not None:
+            self.live_unit = "bytes"
+        else:
+            self.live_unit = "objects"
+
+        # how much the live memory changed during the last frame and how much was live when the current one started
+        self.live_change = 0
+        self.live_at_start = 0
+        self.frame_start = 0.0
+
+    # called once the level has loaded, everything made so far lives until the game ends so it is
+    # collected once and then frozen (if gc.freeze exists) so later collections skip over it
+    def start(self):
+        gc.collect()
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+        gc.disable()
+        if self.measure and tracemalloc is not None:
+            tracemalloc.start()
+
+    # turns the automatic garbage collector back on
+    def stop(self):
+        if self.measure and tracemalloc is not None:
+            tracemalloc.stop()
+        if hasattr(gc, "unfreeze"):
+            gc.unfreeze()
+        gc.enable()
+
+    # returns how much memory is live, in bytes if tracemalloc exists and otherwise in the objects that the
+    # garbage collector tracks, an object only adds to the count until it is freed or collected
+    def get_live(self):
+        if tracemalloc is not None:
+            return tracemalloc.get_traced_memory()[0]
+        return gc.get_count()[0]
+
+    # starts a new frame
+    def begin_frame(self):
+        self.frame_start = default_timer()
+        if self.measure:
+            self.live_at_start = self.get_live()
+
+    # ends the frame and collects garbage if the frame left time for it
+    def end_frame(self):
+        if self.measure:
+            self.live_change = self.get_live() - self.live_at_start
+
+        if (default_timer() - self.frame_start) * 1000.0 < self.budget \
+                or self.skipped_frames >= self.max_skipped_frames:
+            self.collect()
+            self.skipped_frames = 0
+        else:
+            self.skipped_frames += 1
+
+    # collects the oldest generation that has gone over its threshold, the same
+    # generation that the automatic collector would have collected
+    def collect(self):
+        counts = gc.get_count()
+        thresholds = gc.get_threshold()
+        for generation in (2, 1, 0):
+            if counts[generation] > thresholds[generation]:
+                gc.collect(generation)
+                break
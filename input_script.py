@@ -0,0 +1,119 @@
+import pygame
+
+# the names of the keys that the game responds to
+KEYS = {
+    "a": pygame.K_a,
+    "s": pygame.K_s,
+    "space": pygame.K_SPACE,
+    "left": pygame.K_LEFT,
+    "right": pygame.K_RIGHT
+}
+
+# the names used for the two types of key events
+EVENT_TYPES = {
+    "down": pygame.KEYDOWN,
+    "up": pygame.KEYUP
+}
+
+# the names of the keys and event types looked up by their value, used when recording
+KEY_NAMES = dict((value, name) for name, value in KEYS.items())
+EVENT_TYPE_NAMES = dict((value, name) for name, value in EVENT_TYPES.items())
+
+
+class InputScriptException(Exception):
+    pass
+
+
+# class to represent a scripted source of key presses, this is used instead
+# of the keyboard when the game is ran without a display
+class InputScript:
+
+    def __init__(self):
+        # maps a tick to the key events that happen on that tick
+        self.events = {}
+
+        # the seed for the random numbers used by the game, None if the script doesn't have one
+        self.seed = None
+
+        # how many ticks the script lasts for, None if it ends with its last event
+        self.end = None
+
+    # adds a key event that happens on the passed in tick, the event type is
+    # either "down" or "up" and the key is one of the names in KEYS
+    def add(self, tick, event_type, key):
+        event = pygame.event.Event(EVENT_TYPES[event_type], key=KEYS[key])
+        self.events.setdefault(tick, []).append(event)
+
+    # returns the key events that happen on the passed in tick
+    def get_events(self, tick):
+        return self.events.get(tick, [])
+
+    # returns how many ticks the script lasts for
+    def get_length(self):
+        if self.end is not None:
+            return self.end
+        if not self.events:
+            return 0
+        return max(self.events) + 1
+
+
+# loads a script where every line holds the tick a key event happens on, whether the
+# key goes "down" or "up" and the name of the key, for example: 120 down space
+# a line can also hold the seed for the random numbers (seed 42) or how many ticks the script lasts (end 900)
+def load_script(filename):
+    script = InputScript()
+    with open(filename) as lines:
+        for number, line in enumerate(lines):
+            # skip over blank lines and comments
+            line = line.split("#")[0].strip()
+            if not line:
+                continue
+            try:
+                if line.startswith("seed"):
+                    script.seed = int(line.split()[1])
+                elif line.startswith("end"):
+                    script.end = int(line.split()[1])
+                else:
+                    tick, event_type, key = line.split()
+                    script.add(int(tick), event_type, key)
+            except (ValueError, KeyError, IndexError):
+                raise InputScriptException("Couldn't read line {} of {} - {}".format(number + 1, filename, line))
+    return script
+
+
+# returns a script that runs back and forth across the level for the passed in amount
+# of ticks while shooting and jumping, used when no other script is provided
+def patrol_script(ticks, turn_every=2000, shoot_every=25, jump_every=150):
+    script = InputScript()
+    direction = "right"
+    script.add(0, "down", direction)
+    for tick in range(1, ticks):
+        if tick % turn_every == 0:
+            script.add(tick, "up", direction)
+            direction = "left" if direction == "right" else "right"
+            script.add(tick, "down", direction)
+        if tick % shoot_every == 0:
+            script.add(tick, "down", "a")
+        if tick % jump_every == 0:
+            script.add(tick, "down", "space")
+    return script
+
+
+# class to record the key events the game responds to into a file that can be
+# loaded with load_script, this lets a session be replayed exactly as it was played
+class InputRecorder:
+
+    def __init__(self, filename, seed):
+        self.file = open(filename, "w")
+        self.file.write("seed {}\n".format(seed))
+
+    # records the key event as happening on the passed in tick, keys
+    # that the game doesn't respond to are left out
+    def record(self, tick, event):
+        if event.key in KEY_NAMES and event.type in EVENT_TYPE_NAMES:
+            self.file.write("{} {} {}\n".format(tick, EVENT_TYPE_NAMES[event.type], KEY_NAMES[event.key]))
+
+    # finishes the recording, ticks is how many ticks the session lasted for
+    def close(self, ticks):
+        self.file.write("end {}\n".format(ticks))
+        self.file.close()
@@ -0,0 +1,62 @@
+import os
+import json
+import hashlib
+from compiled_level import CompiledLevel, write_compiled_level, VERSION
+from level_stream import DEFAULT_CHUNK_WIDTH
+
+
+# class to represent a directory of compiled copies of .stg levels, each copy is named after a hash of
+# the level's contents so a level that changes gets a new copy and the old one is never used again, the
+# copies that went the longest without being used are deleted once there are too many of them
+class LevelCache:
+
+    def __init__(self, directory, max_entries, chunk_width=DEFAULT_CHUNK_WIDTH):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.chunk_width = chunk_width
+
+    # returns the key for the contents of the passed in level file, the compiled format and the chunk width
+    # are part of the key so that changing either of them doesn't pick up copies made the old way
+    def get_key(self, contents):
+        digest = hashlib.sha1(contents)
+        digest.update("stgb {} {}".format(VERSION, self.chunk_width))
+        return digest.hexdigest()
+
+    # returns the path of the compiled copy with the passed in key
+    def get_path(self, key):
+        return os.path.join(self.directory, key + ".stgb")
+
+    # returns the compiled copy of the .stg level at the passed in path, compiling it into the cache first if needed
+    def load(self, filename):
+        with open(filename, "rb") as level_file:
+            contents = level_file.read()
+        path = self.get_path(self.get_key(contents))
+
+        if os.path.exists(path):
+            # mark the copy as just used so that it is the last to be evicted
+            os.utime(path, None)
+        else:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+
+            # write to a temporary file first so that a copy that is only half written is never used
+            temporary = "{}.{}.tmp".format(path, os.getpid())
+            write_compiled_level(json.loads(contents), temporary, self.chunk_width)
+            if os.path.exists(path):
+                os.remove(temporary)
+            else:
+                os.rename(temporary, path)
+            self.evict()
+
+        return CompiledLevel(path)
+
+    # deletes the copies that went the longest without being used until there are few enough of them
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".stgb"):
+                path = os.path.join(self.directory, name)
+                entries.append((os.path.getmtime(path), path))
+        entries.sort()
+        for used, path in entries[:max(0, len(entries) - self.max_entries)]:
+            os.remove(path)
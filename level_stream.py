@@ -0,0 +1,264 @@
+import os
+import json
+import argparse
+
+# the name of the file in a chunked level directory that holds the rules and the chunk table
+INDEX_FILE = "level.json"
+
+# how wide (in pixels) the chunks are when a level is split up, unless told otherwise
+DEFAULT_CHUNK_WIDTH = 2400
+
+# how wide (in pixels) the columns are that the streamer sorts chunks into to find the ones near the screen
+COLUMN_WIDTH = 1200
+
+# chunks that span more columns than this are checked every update instead of being put in columns
+MAX_COLUMNS = 8
+
+# how far (in pixels) past each side of a unit the chunks under it are kept loaded, this has
+# to be more than a unit can move in one tick so that it never moves onto a missing chunk
+UNIT_MARGIN = 64
+
+
+class LevelStreamException(Exception):
+    pass
+
+
+# returns the platform in the passed in row of a level as (order, x, y, width, height, color, type)
+def get_record(order, row):
+    return order, row["x"], row["y"], row["width"], row["height"], row["color"], row["type"]
+
+
+# class to represent a level stored in a single .stg file, the whole file is read when the
+# level loads so every platform is in one chunk that covers the whole world
+class JsonLevel:
+
+    def __init__(self, filename):
+        with open(filename) as level_file:
+            level = json.load(level_file)
+        self.rules = level["rules"]
+        self.rows = level["platforms"]
+
+        # the left and right side of the area that each chunk's platforms cover, None covers everything
+        self.bounds = [None]
+
+    # returns the platforms in the chunk at the passed in index as (order, x, y, width, height, color, type),
+    # the order is where the platform is in the level and decides which platform a unit collides with first
+    def load_chunk(self, index):
+        return [get_record(order, row) for order, row in enumerate(self.rows)]
+
+
+# class to represent a level that has been split into chunks by its x coordinates, the
+# directory holds an index file with the rules and a table of the chunks, and a file for
+# every chunk, only the index is read when the level loads
+class ChunkedLevel:
+
+    def __init__(self, directory):
+        self.directory = directory
+        try:
+            with open(os.path.join(directory, INDEX_FILE)) as index_file:
+                index = json.load(index_file)
+        except IOError:
+            raise LevelStreamException("{} is not a chunked level, it has no {}".format(directory, INDEX_FILE))
+        self.rules = index["rules"]
+        self.files = [chunk["file"] for chunk in index["chunks"]]
+        self.bounds = [(chunk["left"], chunk["right"]) for chunk in index["chunks"]]
+
+    # returns the platforms in the chunk at the passed in index as (order, x, y, width, height, color, type)
+    def load_chunk(self, index):
+        with open(os.path.join(self.directory, self.files[index])) as chunk_file:
+            chunk = json.load(chunk_file)
+        return [get_record(row["order"], row) for row in chunk["platforms"]]
+
+
+# splits the platforms of the passed in level into chunks by their left side, platforms wider
+# than a chunk are put in their own chunk so that they don't keep a whole chunk loaded, returns
+# a list of chunks where each chunk is its left side, right side and (order, row) pairs
+def split_level(level, chunk_width):
+    columns = {}
+    wide = []
+    for order, row in enumerate(level["platforms"]):
+        if row["width"] > chunk_width:
+            wide.append((order, row))
+        else:
+            columns.setdefault(int(row["x"]) // chunk_width, []).append((order, row))
+
+    chunks = []
+    for column in sorted(columns):
+        rows = columns[column]
+        left = min(int(row["x"]) for order, row in rows)
+        right = max(int(row["x"]) + int(row["width"]) for order, row in rows)
+        chunks.append((left, right, rows))
+    for order, row in wide:
+        chunks.append((int(row["x"]), int(row["x"]) + int(row["width"]), [(order, row)]))
+    return chunks
+
+
+# writes the passed in level into the passed in directory as a chunked level
+def write_chunked_level(level, directory, chunk_width=DEFAULT_CHUNK_WIDTH):
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    table = []
+    for number, (left, right, rows) in enumerate(split_level(level, chunk_width)):
+        filename = "chunk_{}.json".format(number)
+        platforms = []
+        for order, row in rows:
+            row = dict(row)
+            row["order"] = order
+            platforms.append(row)
+        with open(os.path.join(directory, filename), "w") as chunk_file:
+            json.dump({"platforms": platforms}, chunk_file)
+        table.append({"file": filename, "left": left, "right": right})
+
+    with open(os.path.join(directory, INDEX_FILE), "w") as index_file:
+        json.dump({"rules": level["rules"], "chunk-width": chunk_width, "chunks": table}, index_file, indent=4)
+
+
+# class to load the chunks of a level into the platform store (and the grid and ground index that go with
+# it) as the camera gets close to them, and unload them again once too many chunks are loaded
+class LevelStreamer:
+
+    def __init__(self, level, store, grid, ground_index, keep_type, margin, max_chunks, loads_per_update):
+        self.level = level
+        self.store = store
+        self.grid = grid
+        self.ground_index = ground_index
+
+        # returns False for the types of platform that shouldn't be loaded
+        self.keep_type = keep_type
+
+        # how far (in pixels) past each side of the screen chunks are loaded
+        self.margin = margin
+
+        # how many chunks can stay loaded before the ones furthest from the screen are unloaded
+        self.max_chunks = max_chunks
+
+        # how many chunks that are not on the screen yet can be loaded by one update
+        self.loads_per_update = loads_per_update
+
+        # maps the index of every loaded chunk to the indexes of its platforms in the store
+        self.loaded = {}
+
+        # the chunks that overlap each column of the world, and the chunks that are too wide to put in columns
+        self.columns = {}
+        self.everywhere = []
+        for index, bounds in enumerate(level.bounds):
+            if bounds is None or (bounds[1] - bounds[0]) // COLUMN_WIDTH > MAX_COLUMNS:
+                self.everywhere.append(index)
+            else:
+                for column in range(bounds[0] // COLUMN_WIDTH, (bounds[1] - 1) // COLUMN_WIDTH + 1):
+                    self.columns.setdefault(column, []).append(index)
+
+    # returns the indexes of the chunks that might overlap the span from left to right
+    def get_candidates(self, left, right):
+        candidates = set(self.everywhere)
+        for column in range(left // COLUMN_WIDTH, (right - 1) // COLUMN_WIDTH + 1):
+            candidates.update(self.columns.get(column, []))
+        return candidates
+
+    # returns how far the chunk at the passed in index is from the span between left and right, 0 if they overlap
+    def get_distance(self, index, left, right):
+        bounds = self.level.bounds[index]
+        if bounds is None:
+            return 0
+        if bounds[1] <= left:
+            return left - bounds[1] + 1
+        if bounds[0] >= right:
+            return bounds[0] - right + 1
+        return 0
+
+    # adds every platform in the chunk at the passed in index to the store, grid and ground index
+    def load_chunk(self, index):
+        store = self.store
+        platforms = []
+        for order, x, y, width, height, color, ptype in self.level.load_chunk(index):
+            if self.keep_type(ptype):
+                platform = store.add(x, y, width, height, color, ptype, order)
+                self.grid.insert(platform)
+                self.ground_index.insert(store.x[platform], store.y[platform], store.x[platform] + store.width[platform])
+                platforms.append(platform)
+        self.loaded[index] = platforms
+
+    # takes every platform in the chunk at the passed in index out of the store, grid and ground index
+    def unload_chunk(self, index):
+        store = self.store
+        for platform in self.loaded.pop(index):
+            self.grid.remove(platform)
+            self.ground_index.remove(store.x[platform], store.y[platform], store.x[platform] + store.width[platform])
+            store.remove(platform)
+
+    # returns the indexes of the chunks that overlap any of the passed in spans
+    def get_overlapping(self, spans):
+        overlapping = set()
+        for span_left, span_right in spans:
+            span_left = int(span_left) - UNIT_MARGIN
+            span_right = int(span_right) + UNIT_MARGIN
+            for index in self.get_candidates(span_left, span_right):
+                if self.get_distance(index, span_left, span_right) == 0:
+                    overlapping.add(index)
+        return overlapping
+
+    # loads the chunks near the screen (which spans from left to right in world coordinates) and unloads the
+    # chunks furthest away if there are too many. Chunks that are on the screen or under one of the passed in
+    # spans (the units that move around) are always loaded, returns the left and right side of every chunk
+    # that was loaded or unloaded
+    def update(self, left, right, spans=(), limit=True):
+        changed = []
+        left = int(left)
+        right = int(right)
+        near_left = left - self.margin
+        near_right = right + self.margin
+        needed = self.get_overlapping(spans)
+
+        # load the missing chunks, closest first
+        missing = []
+        for index in self.get_candidates(near_left, near_right):
+            if index not in self.loaded and self.get_distance(index, near_left, near_right) == 0:
+                missing.append((self.get_distance(index, left, right), index))
+        for index in needed:
+            if index not in self.loaded:
+                missing.append((0, index))
+        missing = sorted(set(missing))
+        loads = 0
+        for distance, index in missing:
+            if limit and distance > 0 and loads >= self.loads_per_update:
+                break
+            self.load_chunk(index)
+            changed.append(self.get_bounds(index))
+            if distance > 0:
+                loads += 1
+
+        # unload the chunks that are furthest away until there are few enough of them
+        if len(self.loaded) > self.max_chunks:
+            far = []
+            for index in self.loaded:
+                distance = self.get_distance(index, near_left, near_right)
+                if distance > 0 and index not in needed:
+                    far.append((distance, index))
+            far.sort(reverse=True)
+            for distance, index in far[:len(self.loaded) - self.max_chunks]:
+                changed.append(self.get_bounds(index))
+                self.unload_chunk(index)
+
+        return changed
+
+    # returns the left and right side of the chunk at the passed in index, None if it covers the whole world
+    def get_bounds(self, index):
+        return self.level.bounds[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Splits a level into chunks that the game loads as the camera gets close")
+    parser.add_argument("level", help="the .stg file of the level")
+    parser.add_argument("directory", help="where to write the chunked level")
+    parser.add_argument("--chunk-width", type=int, default=DEFAULT_CHUNK_WIDTH, help="how wide each chunk is in pixels")
+    arguments = parser.parse_args()
+
+    with open(arguments.level) as level_file:
+        level = json.load(level_file)
+    write_chunked_level(level, arguments.directory, arguments.chunk_width)
+    print "Wrote {} platforms to {}".format(len(level["platforms"]), arguments.directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import pygame
+from array import array
 # import json
 from GLOBALS import BLACK
+from rendering import blit_batch
 
 # class PlatformTypeException(Exception):
 #    pass
@@ -10,7 +12,7 @@ from GLOBALS import BLACK
 class Platform(pygame.sprite.Sprite):
 
     def __init__(self, groups, rect, ptype=None, width=None, height=None, color=None):
-        pygame.sprite.Sprite.__init__(self, groups.platforms, groups.scrolling_units)
+        pygame.sprite.Sprite.__init__(self, groups.platforms)
 
         # if ptype is not None:
         #    try:
@@ -33,13 +35,138 @@ class Platform(pygame.sprite.Sprite):
         self.posn = [rect[0], rect[1]]
         self.ptype = ptype
 
-    # draws the platform
-    def draw_platform(self, surface):
-        pygame.draw.rect(surface, self.color, self.rect)
-
-        # Draws an outline around the platform, its more pleasant to look at
-        pygame.draw.rect(surface, BLACK, self.rect, 1)
+    # draws the platform, the offset is the position of the camera
+    def draw_platform(self, surface, offset):
+        draw_platform_rect(surface, self.color, self.rect.move(offset, 0))
 
     # updates the platform's rect
     def update_rect(self):
         self.rect = pygame.Rect((self.posn[0], self.posn[1]) + (self.width, self.height))
+
+
+# draws a platform with the passed in color in the passed in rect (in screen coordinates)
+def draw_platform_rect(surface, color, rect):
+    pygame.draw.rect(surface, color, rect)
+
+    # Draws an outline around the platform, its more pleasant to look at
+    pygame.draw.rect(surface, BLACK, rect, 1)
+
+
+# class to hold the static platforms of a level in typed arrays instead of a sprite for each one, a
+# platform is referred to by its index, the slots of removed platforms are used again by new ones
+class PlatformStore:
+
+    def __init__(self):
+        self.x = array("i")
+        self.y = array("i")
+        self.width = array("i")
+        self.height = array("i")
+
+        # the red, green and blue of every platform one after the other
+        self.colors = array("B")
+
+        # the index of every platform's type in type_names
+        self.type_ids = array("H")
+        self.type_names = []
+
+        # the order of every platform in its level, this decides which platform a unit collides with first
+        self.order = array("l")
+
+        # the indexes of removed platforms that can be used again
+        self.free = []
+
+        # platforms that have been turned into sprites, looked up by their index
+        self.sprites = {}
+
+    # adds a platform and returns its index, the position and size are cut down to whole pixels like a rect
+    # would be, the order is where the platform is in its level and defaults to the order it was added in
+    def add(self, x, y, width, height, color, ptype, order=None):
+        if ptype not in self.type_names:
+            self.type_names.append(ptype)
+        if order is None:
+            order = len(self.x)
+
+        if self.free:
+            index = self.free.pop()
+            self.x[index] = int(x)
+            self.y[index] = int(y)
+            self.width[index] = int(width)
+            self.height[index] = int(height)
+            self.colors[index * 3:index * 3 + 3] = array("B", color[:3])
+            self.type_ids[index] = self.type_names.index(ptype)
+            self.order[index] = order
+            return index
+
+        self.x.append(int(x))
+        self.y.append(int(y))
+        self.width.append(int(width))
+        self.height.append(int(height))
+        self.colors.extend(color[:3])
+        self.type_ids.append(self.type_names.index(ptype))
+        self.order.append(order)
+        return len(self.x) - 1
+
+    # removes the platform at the passed in index, its slot is given an empty size so it never collides
+    def remove(self, index):
+        self.width[index] = 0
+        self.height[index] = 0
+        # a sprite made for the platform has to leave its groups, otherwise it would stay in
+        # groups.platforms after the slot is given to another platform
+        sprite = self.sprites.pop(index, None)
+        if sprite is not None:
+            sprite.kill()
+        self.free.append(index)
+
+    def __len__(self):
+        return len(self.x) - len(self.free)
+
+    # returns a rect that covers the platform at the passed in index
+    def get_rect(self, index):
+        return pygame.Rect(self.x[index], self.y[index], self.width[index], self.height[index])
+
+    # returns the color of the platform at the passed in index
+    def get_color(self, index):
+        return tuple(self.colors[index * 3:index * 3 + 3])
+
+    # returns the name of the type of the platform at the passed in index
+    def get_type(self, index):
+        return self.type_names[self.type_ids[index]]
+
+    # returns the indexes of every platform with the passed in type
+    def find_type(self, ptype):
+        if ptype not in self.type_names:
+            return []
+        type_id = self.type_names.index(ptype)
+        free = set(self.free)
+        return [index for index in range(len(self.type_ids)) if self.type_ids[index] == type_id and index not in free]
+
+    # returns a sprite for the platform at the passed in index for code that needs a platform
+    # object of its own, the sprite is made the first time it is asked for and joins the platform group
+    def get_sprite(self, index, groups):
+        sprite = self.sprites.get(index)
+        if sprite is None:
+            sprite = Platform(groups, (self.x[index], self.y[index]), self.get_type(index),
+                              self.width[index], self.height[index], self.get_color(index))
+            self.sprites[index] = sprite
+        return sprite
+
+    # draws the platform at the passed in index, the offset is the position of the camera
+    def draw_platform(self, index, surface, offset):
+        draw_platform_rect(surface, self.get_color(index), (self.x[index] + offset, self.y[index],
+                                                             self.width[index], self.height[index]))
+
+    # draws the platforms at the passed in indexes in order, the platforms are blitted in batches from
+    # the surfaces in the sprite cache and the ones too big to be cached are drawn one at a time
+    def draw_platforms(self, indexes, surface, offset, sprite_cache):
+        batch = []
+        for index in indexes:
+            sprite = sprite_cache.get("outlined rect", (self.width[index], self.height[index]),
+                                      self.get_color(index), surface)
+            if sprite is None:
+                # the platforms before this one have to be drawn first in case they overlap
+                blit_batch(surface, batch)
+                batch = []
+                self.draw_platform(index, surface, offset)
+            else:
+                batch.append((sprite, (self.x[index] + offset, self.y[index])))
+        blit_batch(surface, batch)
@@ -0,0 +1,35 @@
+# class to represent a pool of objects that are used again instead of being
+# created every time one is needed and thrown away when it is done
+class Pool:
+
+    def __init__(self, create, size):
+        # the function that creates a new object when the pool is empty
+        self.create = create
+
+        # the most objects that the pool holds onto
+        self.size = size
+        self.free = [create() for i in range(size)]
+
+        # how many times an object was taken from the pool and how many
+        # times the pool was empty and a new object had to be created
+        self.hits = 0
+        self.misses = 0
+
+    # returns an object from the pool, or a new one if the pool is empty
+    def acquire(self):
+        if self.free:
+            self.hits += 1
+            return self.free.pop()
+        self.misses += 1
+        return self.create()
+
+    # puts the object back into the pool unless the pool is already full, returns True if it was kept
+    def release(self, item):
+        if len(self.free) < self.size:
+            self.free.append(item)
+            return True
+        return False
+
+    # returns the hits and misses of the pool as a readable string
+    def get_stats(self):
+        return "{} hits, {} misses, {} free".format(self.hits, self.misses, len(self.free))
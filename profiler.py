@@ -0,0 +1,77 @@
+from timeit import default_timer
+
+# the phases of a frame in the order that they happen, every phase that runs once
+# per tick is added up over all of the ticks in the frame
+PHASES = ("events", "streaming", "bullets", "spawning", "player", "enemies", "physics", "drawing", "display")
+
+
+# class to time each phase of the frames that the game draws, the last few frames are kept in
+# a ring buffer and every phase is also written to the trace if there is one. Nothing is timed
+# while the profiler is disabled unless something else needs the timings (the trace or the
+# watchdog), so marking a phase only costs a method call and a check
+class FrameProfiler:
+
+    def __init__(self, size):
+        self.enabled = False
+
+        # the seconds that each phase took in the last few frames, the oldest frame is replaced first
+        self.frames = [None] * size
+        self.index = 0
+
+        # the frame that is being timed, when it started and when the last phase of it ended
+        self.current = None
+        self.start = 0.0
+        self.last = 0.0
+
+        # the TraceWriter that the phases are written to, None if the game isn't being traced
+        self.trace = None
+
+        # True if frames are timed even while the profiler is disabled
+        self.always_time = False
+
+    # turns the profiler on or off, the recorded frames are thrown away when it is turned off
+    def toggle(self):
+        self.enabled = not self.enabled
+        if not self.enabled:
+            self.frames = [None] * len(self.frames)
+            self.index = 0
+
+    # starts timing a new frame
+    def begin_frame(self):
+        if self.enabled or self.always_time:
+            self.current = dict((phase, 0.0) for phase in PHASES)
+            self.start = default_timer()
+            self.last = self.start
+
+    # adds the time since the last phase ended to the passed in phase
+    def mark(self, phase):
+        if self.current is not None:
+            now = default_timer()
+            self.current[phase] += now - self.last
+            if self.trace is not None:
+                self.trace.add_span(phase, "frame", self.last, now)
+            self.last = now
+
+    # stops timing the frame and puts it into the ring buffer
+    def end_frame(self):
+        if self.current is not None:
+            if self.trace is not None:
+                self.trace.add_span("frame", "frame", self.start, self.last)
+            self.frames[self.index] = self.current
+            self.index = (self.index + 1) % len(self.frames)
+            self.current = None
+
+    # returns the frame that was timed last, None if no frames were timed
+    def get_last(self):
+        return self.frames[self.index - 1]
+
+    # returns the average milliseconds that each phase took over the recorded frames
+    def get_averages(self):
+        frames = [frame for frame in self.frames if frame is not None]
+        averages = dict((phase, 0.0) for phase in PHASES)
+        for frame in frames:
+            for phase in PHASES:
+                averages[phase] += frame[phase]
+        for phase in PHASES:
+            averages[phase] = averages[phase] * 1000.0 / max(len(frames), 1)
+        return averages
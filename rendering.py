@@ -0,0 +1,255 @@
+import pygame
+from collections import OrderedDict
+from GLOBALS import BLACK
+
+# the color that is left see-through around shapes that don't fill their whole
+# surface, the other one is used for shapes that are drawn in that color
+TRANSPARENT = (255, 0, 255)
+OTHER_TRANSPARENT = (0, 255, 0)
+
+
+# returns a new surface with the passed in size in the same format as the passed in surface, a surface
+# with 8 bits per pixel gets its palette as well since a new one starts out with every color black, the
+# palette can only be set once the display is initialized but before that both have the default palette
+def make_surface(size, surface):
+    new_surface = pygame.Surface(size, 0, surface)
+    if surface.get_bitsize() == 8 and pygame.display.get_init():
+        new_surface.set_palette(surface.get_palette())
+    return new_surface
+
+
+# class to represent the static part of a level (the background and the platforms)
+# baked into surfaces, the world is split into chunks that are drawn the first
+# time they come into view and thrown away once too many of them are kept
+class StaticLayer:
+
+    def __init__(self, platform_grid, background_color, chunk_size, max_chunks):
+        self.platform_grid = platform_grid
+        self.background_color = background_color
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+
+        # maps the index of a chunk to its surface, the least recently drawn chunk comes first
+        self.chunks = OrderedDict()
+
+    # draws the background and every platform that is in the chunk at the passed in
+    # index, the surface is made in the same format as the surface it will be drawn on
+    def bake_chunk(self, index, surface):
+        chunk = make_surface(self.chunk_size, surface)
+        chunk.fill(self.background_color)
+        area = pygame.Rect(index * self.chunk_size[0], 0, self.chunk_size[0], self.chunk_size[1])
+        store = self.platform_grid.store
+        for index in self.platform_grid.collide(area):
+            store.draw_platform(index, chunk, -area.left)
+        return chunk
+
+    # returns the chunk at the passed in index, baking it if needed
+    def get_chunk(self, index, surface):
+        chunk = self.chunks.pop(index, None)
+        if chunk is None:
+            chunk = self.bake_chunk(index, surface)
+
+            # evict the chunks that have gone the longest without being drawn
+            while len(self.chunks) >= self.max_chunks:
+                self.chunks.popitem(last=False)
+
+        self.chunks[index] = chunk
+        return chunk
+
+    # throws away the baked chunks that overlap the span from left to right in world coordinates
+    # so that they are baked again, None throws away every chunk
+    def invalidate(self, bounds):
+        for index in list(self.chunks):
+            if bounds is None or (index * self.chunk_size[0] < bounds[1]
+                                  and bounds[0] < (index + 1) * self.chunk_size[0]):
+                del self.chunks[index]
+
+    # draws the chunks that are on the screen, the offset is the position of the camera
+    def draw(self, surface, offset):
+        first = -offset // self.chunk_size[0]
+        last = (surface.get_width() - offset - 1) // self.chunk_size[0]
+        for index in range(first, last + 1):
+            surface.blit(self.get_chunk(index, surface), (index * self.chunk_size[0] + offset, 0))
+
+
+# class to keep track of the parts of the screen that change between frames so
+# that only those parts have to be sent to the display, anything drawn in the
+# last frame is included as well so that it gets erased
+class DirtyRects:
+
+    def __init__(self):
+        self.last = []
+        self.current = []
+
+        # True if the whole screen has to be sent to the display this frame
+        self.everything = True
+
+    # marks the passed in rect (in screen coordinates) as changed this frame
+    def add(self, rect):
+        self.current.append(rect)
+
+    # marks the whole screen as changed this frame
+    def add_everything(self):
+        self.everything = True
+
+    # returns the rects to send to the display for this frame and starts the next
+    # one, None is returned if the whole screen has to be sent to the display
+    def collect(self):
+        if self.everything:
+            rects = None
+        else:
+            rects = self.last + self.current
+        self.last = self.current
+        self.current = []
+        self.everything = False
+        return rects
+
+
+# class to keep the fonts and the rendered text that the game draws every frame, a font is only
+# looked up once for each name and size, and the most recently drawn text surfaces are kept so that
+# text that doesn't change between frames is not rendered again
+class TextCache:
+
+    def __init__(self, max_surfaces):
+        self.max_surfaces = max_surfaces
+
+        # maps (name, size) to the font
+        self.fonts = {}
+
+        # maps (text, size, color, name) to the rendered surface, the least recently drawn text comes first
+        self.surfaces = OrderedDict()
+
+    # returns the system font with the passed in name and size, looking it up if needed
+    def get_font(self, name, size):
+        font = self.fonts.get((name, size))
+        if font is None:
+            font = pygame.font.SysFont(name, size)
+            self.fonts[(name, size)] = font
+        return font
+
+    # returns the passed in text rendered in the passed in size and color, rendering it if needed
+    def render(self, text, size, color, name="monospace"):
+        key = (text, size, tuple(color), name)
+        surface = self.surfaces.pop(key, None)
+        if surface is None:
+            surface = self.get_font(name, size).render(text, 1, color)
+
+            # evict the text that has gone the longest without being drawn
+            while len(self.surfaces) >= self.max_surfaces:
+                self.surfaces.popitem(last=False)
+
+        self.surfaces[key] = surface
+        return surface
+
+
+# class to represent the heads up display in the corner of the screen, a line of text is
+# only rendered again when the value that it shows changes
+class Hud:
+
+    def __init__(self, text_cache, font_size, color, posn):
+        self.text_cache = text_cache
+        self.font_size = font_size
+        self.color = color
+        self.posn = posn
+
+        # maps the label of every line to the value it shows and its rendered surface
+        self.lines = OrderedDict()
+
+    # sets the value shown next to the passed in label, the line is added if it is new
+    def set(self, label, value):
+        line = self.lines.get(label)
+        if line is None or line[0] != value:
+            text = "{}: {}".format(label, value)
+            self.lines[label] = (value, self.text_cache.render(text, self.font_size, self.color))
+
+    # draws every line one under the other, returns the area of the screen that was drawn on
+    def draw(self, surface):
+        area = pygame.Rect(self.posn, (0, 0))
+        y = self.posn[1]
+        for value, text in self.lines.values():
+            area.union_ip(surface.blit(text, (self.posn[0], y)))
+            y += text.get_height()
+        return area
+
+
+# fills the surface with the passed in color
+def render_rect(surface, color):
+    surface.fill(color)
+
+
+# fills the surface with the passed in color and draws an outline around it
+def render_outlined_rect(surface, color):
+    surface.fill(color)
+    pygame.draw.rect(surface, BLACK, surface.get_rect(), 1)
+
+
+# draws a circle with an outline that fills the surface, the rest of the surface is see-through, pygame draws
+# a circle one pixel past its diameter so the surface is one pixel bigger than the circle's size
+def render_outlined_circle(surface, color):
+    transparent = TRANSPARENT if tuple(color) != TRANSPARENT else OTHER_TRANSPARENT
+    surface.fill(transparent)
+
+    # run length encoding makes blitting a surface with a see-through color many times faster
+    surface.set_colorkey(transparent, pygame.RLEACCEL)
+    radius = (surface.get_width() - 1) / 2
+    pygame.draw.circle(surface, color, (radius, radius), radius)
+    pygame.draw.circle(surface, BLACK, (radius, radius), radius, 1)
+
+
+# the functions that draw each shape that the sprite cache can hold and how many pixels
+# past the shape's size (on the right and bottom) the surface of the shape has to be
+SHAPES = {
+    "rect": (render_rect, 0),
+    "outlined rect": (render_outlined_rect, 0),
+    "outlined circle": (render_outlined_circle, 1)
+}
+
+
+# class to keep the surfaces of the shapes that the units and platforms are drawn with, so that a shape
+# is drawn once and blitted after that. Surfaces are kept by shape, size and color, the ones that have
+# gone the longest without being used are thrown away first, shapes wider or taller than max_size are never kept
+class SpriteCache:
+
+    def __init__(self, max_surfaces, max_size):
+        self.max_surfaces = max_surfaces
+        self.max_size = max_size
+
+        # maps (shape, size, color) to the surface and to when it was last used, plain dicts are used instead
+        # of an OrderedDict since every unit looks its surface up every frame and the oldest surface only has
+        # to be found when a new one is drawn
+        self.surfaces = {}
+        self.last_used = {}
+        self.uses = 0
+
+    # returns the surface of the shape with the passed in size and color, drawing it if needed, the surface is made
+    # in the same format as the surface it will be drawn on. None is returned if the shape is too big or has no area
+    def get(self, shape, size, color, surface):
+        if not 0 < size[0] <= self.max_size[0] or not 0 < size[1] <= self.max_size[1]:
+            return None
+        key = (shape, tuple(size), tuple(color))
+        sprite = self.surfaces.get(key)
+        if sprite is None:
+            render, padding = SHAPES[shape]
+            sprite = make_surface((size[0] + padding, size[1] + padding), surface)
+            render(sprite, color)
+
+            # evict the surfaces that have gone the longest without being used
+            while len(self.surfaces) >= self.max_surfaces:
+                oldest = min(self.last_used, key=self.last_used.get)
+                del self.surfaces[oldest]
+                del self.last_used[oldest]
+            self.surfaces[key] = sprite
+
+        self.uses += 1
+        self.last_used[key] = self.uses
+        return sprite
+
+
+# blits every (surface, position) pair in the batch onto the passed in surface, in one call where pygame
+# has Surface.blits (1.9.4 and newer) and one blit at a time where it doesn't
+def blit_batch(surface, batch):
+    if hasattr(surface, "blits"):
+        surface.blits(batch, 0)
+    else:
+        for sprite, posn in batch:
+            surface.blit(sprite, posn)
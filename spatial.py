@@ -0,0 +1,288 @@
+from bisect import bisect_left, bisect_right
+
+
+# class to represent a uniform grid, every item is stored in each cell that it
+# covers so that a query only has to look at the items near the passed in rect
+class UniformGrid:
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    # returns the range of cells that the passed in rect covers
+    def get_cell_range(self, left, top, right, bottom):
+        # a rect covers every pixel up to (but not including) its right and
+        # bottom edges, so the last pixel is used to find the last cell
+        right = max(left, right - 1)
+        bottom = max(top, bottom - 1)
+        return (left // self.cell_size, top // self.cell_size,
+                right // self.cell_size, bottom // self.cell_size)
+
+    # adds the item to every cell that the passed in area covers
+    def insert_area(self, item, left, top, right, bottom):
+        x0, y0, x1, y1 = self.get_cell_range(left, top, right, bottom)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                self.cells.setdefault((cx, cy), []).append(item)
+
+    # takes the item out of every cell that the passed in area covers
+    def remove_area(self, item, left, top, right, bottom):
+        x0, y0, x1, y1 = self.get_cell_range(left, top, right, bottom)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells[(cx, cy)]
+                cell.remove(item)
+                if not cell:
+                    del self.cells[(cx, cy)]
+
+    # returns all the items that share a cell with the passed in rect
+    def query(self, rect):
+        x0, y0, x1, y1 = self.get_cell_range(rect.left, rect.top, rect.right, rect.bottom)
+        found = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is not None:
+                    found.update(cell)
+        return found
+
+
+# class to represent a uniform grid over the static platforms in a platform store, the
+# grid holds the index of each platform so that a collision query only has to look at
+# the platforms that are near the unit instead of every platform
+class PlatformGrid(UniformGrid):
+
+    def __init__(self, cell_size, store):
+        UniformGrid.__init__(self, cell_size)
+        self.store = store
+
+        # goes up every time a platform is added or taken out, so copies of the cells know when they are out of date
+        self.version = 0
+
+    # adds the platform at the passed in index to every cell that it covers
+    def insert(self, index):
+        store = self.store
+        left = store.x[index]
+        top = store.y[index]
+        self.insert_area(index, left, top, left + store.width[index], top + store.height[index])
+        self.version += 1
+
+    # takes the platform at the passed in index out of the grid, this has to happen before it is removed from the store
+    def remove(self, index):
+        store = self.store
+        left = store.x[index]
+        top = store.y[index]
+        self.remove_area(index, left, top, left + store.width[index], top + store.height[index])
+        self.version += 1
+
+    # returns the indexes of the platforms that collide with the passed in rect in the order
+    # they are in the level, the same platforms that rect.colliderect would find
+    def collide(self, rect):
+        store = self.store
+        x, y, width, height = store.x, store.y, store.width, store.height
+        left, top, right, bottom = rect.left, rect.top, rect.right, rect.bottom
+        colliding = [index for index in self.query(rect)
+                     if x[index] < right and left < x[index] + width[index]
+                     and y[index] < bottom and top < y[index] + height[index]]
+        colliding.sort(key=store.order.__getitem__)
+        return colliding
+
+
+# class to represent a segment tree over the x axis that holds the heights of top edges, it finds
+# the nearest edge at or below a y coordinate that overlaps a span without looking at every edge.
+# The x axis is split into slabs between the sides of the edges, each node covers a range of slabs
+# and keeps the sorted heights of the edges that cover all of its range (cover) and of the edges
+# that touch any part of its range (inside), so a query does one bisect in each of the O(log n)
+# nodes that it visits. Edges with no width never overlap a span and are left out
+class EdgeTree:
+
+    def __init__(self, edges):
+        # the sorted x coordinates of the sides of the edges, slab i goes from xs[i] to xs[i + 1]
+        self.xs = sorted(set([edge[0] for edge in edges] + [edge[2] for edge in edges]))
+        self.slabs = max(len(self.xs) - 1, 0)
+
+        self.cover = [[] for i in range(4 * max(self.slabs, 1))]
+        self.inside = [[] for i in range(4 * max(self.slabs, 1))]
+        for left, top, right in edges:
+            if left < right:
+                self.add(1, 0, self.slabs, bisect_left(self.xs, left), bisect_left(self.xs, right), top)
+        if self.slabs > 0:
+            self.finish(1, 0, self.slabs)
+
+    # adds the height of an edge that covers the slabs from start up to (but not including) end to the
+    # nodes that make up that range, the node covers the slabs from low up to (but not including) high
+    def add(self, node, low, high, start, end, top):
+        if end <= low or high <= start:
+            return
+        if start <= low and high <= end:
+            self.cover[node].append(top)
+            return
+        middle = (low + high) // 2
+        self.add(node * 2, low, middle, start, end, top)
+        self.add(node * 2 + 1, middle, high, start, end, top)
+
+    # sorts the heights of every node and gathers the heights of the edges that touch each node's range
+    def finish(self, node, low, high):
+        self.cover[node].sort()
+        if high - low > 1:
+            middle = (low + high) // 2
+            self.finish(node * 2, low, middle)
+            self.finish(node * 2 + 1, middle, high)
+            self.inside[node] = sorted(self.cover[node] + self.inside[node * 2] + self.inside[node * 2 + 1])
+        else:
+            self.inside[node] = self.cover[node]
+
+    # returns the smallest height at or below the passed in y coordinate (the closest one since y grows
+    # downwards) of the edges that overlap the span from x to x + width, not including the ends, None
+    # if there are none
+    def nearest_below(self, x, y, width):
+        # the slabs that overlap the span, a slab overlaps it if it starts before the span
+        # ends and ends after the span starts
+        start = max(bisect_right(self.xs, x) - 1, 0)
+        end = min(bisect_left(self.xs, x + width), self.slabs)
+        if start >= end:
+            return None
+        return self.search(1, 0, self.slabs, start, end, y)
+
+    # returns the smallest height at or below y of the edges that touch the slabs from start up to (but
+    # not including) end, looking only in the node that covers the slabs from low up to (but not including) high
+    def search(self, node, low, high, start, end, y):
+        if end <= low or high <= start:
+            return None
+
+        # every edge that touches a node inside the range touches the range, for a node that is only partly
+        # inside the range only the edges that cover all of it are sure to, the rest are found in its children
+        inside = start <= low and high <= end
+        tops = self.inside[node] if inside else self.cover[node]
+        index = bisect_left(tops, y)
+        nearest = tops[index] if index < len(tops) else None
+        if not inside:
+            middle = (low + high) // 2
+            for top in (self.search(node * 2, low, middle, start, end, y),
+                        self.search(node * 2 + 1, middle, high, start, end, y)):
+                if top is not None and (nearest is None or top < nearest):
+                    nearest = top
+        return nearest
+
+
+# class to represent the top edges of the static platforms, the edges are
+# grouped by their height and sorted by their left side so that asking if a
+# unit is standing on something or what surface is below it does not require
+# looking at every platform in the level
+class GroundIndex:
+
+    def __init__(self):
+        # maps the y coordinate of a top edge to the edges at that height
+        self.edges = {}
+
+        # the sorted lefts and the running maximum of the rights for every
+        # height, these are rebuilt lazily whenever a height is changed
+        self.lefts = {}
+        self.reaches = {}
+        self.changed = set()
+
+        # the EdgeTree that finds the surface below a unit, it is built the first time
+        # that it is needed after an edge was added or taken out
+        self.tree = None
+
+    # adds a top edge at the passed in height that spans from left to right
+    def insert(self, left, top, right):
+        self.edges.setdefault(top, []).append((left, right))
+        self.changed.add(top)
+        self.tree = None
+
+    # takes out a top edge that was added before
+    def remove(self, left, top, right):
+        self.edges[top].remove((left, right))
+        self.changed.add(top)
+        self.tree = None
+
+    # rebuilds the sorted edges for every height that has changed
+    def rebuild(self):
+        for top in self.changed:
+            if not self.edges.get(top):
+                self.edges.pop(top, None)
+                self.lefts.pop(top, None)
+                self.reaches.pop(top, None)
+                continue
+            edges = sorted(self.edges[top])
+            self.lefts[top] = [edge[0] for edge in edges]
+            reaches = []
+            reach = None
+            for edge in edges:
+                if reach is None or edge[1] > reach:
+                    reach = edge[1]
+                reaches.append(reach)
+            self.reaches[top] = reaches
+        self.changed = set()
+
+    # returns True if there is an edge at the passed in height that
+    # overlaps the span from x to x + width, not including the ends
+    def edge_at(self, x, top, width):
+        if self.changed:
+            self.rebuild()
+        lefts = self.lefts.get(top)
+        if lefts is None:
+            return False
+
+        # every edge before this index starts to the left of the span, so the
+        # span is covered if the edge that reaches the furthest passes x
+        index = bisect_left(lefts, x + width)
+        return index > 0 and self.reaches[top][index - 1] > x
+
+    # returns True if a unit whose bottom is at the passed in y coordinate
+    # is standing on top of a platform
+    def is_standing(self, x, bottom, width):
+        return self.edge_at(x, bottom, width)
+
+    # returns the y coordinate of the nearest surface at or below the passed in y coordinate for a
+    # unit spanning x to x + width, None if there is nothing below it (used for spawning and ledges)
+    def surface_below(self, x, y, width):
+        if self.tree is None:
+            self.tree = EdgeTree([(left, top, right) for top in self.edges for left, right in self.edges[top]])
+        return self.tree.nearest_below(x, y, width)
+
+
+# class to represent a grid over the units that move (like the enemies), it is
+# cleared and filled again every tick instead of updating units as they move
+class UnitGrid(UniformGrid):
+
+    def __init__(self, cell_size):
+        UniformGrid.__init__(self, cell_size)
+
+        # keeps track of the order that units were inserted in so that
+        # queries return units in the same order as their group
+        self.order = {}
+
+    # adds the unit to every cell that it covers
+    def insert(self, unit):
+        rect = unit.rect
+        self.insert_area(unit, rect.left, rect.top, rect.right, rect.bottom)
+        self.order[unit] = len(self.order)
+
+    # returns the units that collide with the passed in rect, this gives
+    # the same result as pygame.sprite.spritecollide with the unit's group
+    def collide(self, rect):
+        colliding = [unit for unit in self.query(rect) if rect.colliderect(unit.rect)]
+        colliding.sort(key=self.order.get)
+        return colliding
+
+    # removes every unit from the grid
+    def clear(self):
+        self.cells = {}
+        self.order = {}
+
+    # empties the grid and adds every one of the passed in units in order
+    def fill(self, units):
+        self.clear()
+        for unit in units:
+            self.insert(unit)
+
+    # returns a pair for every unit in the grid that collides with one of the passed in
+    # units, the pairs are in the same order as checking each unit with spritecollide
+    def collide_all(self, units):
+        pairs = []
+        for unit in units:
+            for other in self.collide(unit.rect):
+                pairs.append((unit, other))
+        return pairs
@@ -0,0 +1,50 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from entity import Entity, EntityGroup
+from pool import Pool
+
+
+class EntityGroupTest(unittest.TestCase):
+
+    # an entity that is killed and added again before the group is used must only be in it once
+    def test_readd_after_kill(self):
+        group = EntityGroup()
+        entity = Entity(group)
+        entity.kill()
+        entity.add(group)
+        self.assertEqual(group.sprites(), [entity])
+
+    # the same thing through a pool, the way bullets are fired, killed and fired again in one tick
+    def test_pooled_fire_kill_fire(self):
+        group = EntityGroup()
+        pool = Pool(Entity, 2)
+        fired = pool.acquire()
+        fired.add(group)
+        for tick in range(5):
+            fired.kill()
+            pool.release(fired)
+            fired = pool.acquire()
+            fired.add(group)
+            other = pool.acquire()
+            other.add(group)
+            self.assertEqual(len(group), len(set(group.sprites())))
+            other.kill()
+            pool.release(other)
+        self.assertEqual(len(group), 1)
+
+    # entities killed while the group is iterated over are left out the next time it is used
+    def test_kill_while_iterating(self):
+        group = EntityGroup()
+        entities = [Entity(group) for i in range(4)]
+        for entity in group.sprites():
+            entity.kill()
+        entities[0].add(group)
+        self.assertEqual(group.sprites(), [entities[0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import json
+import threading
+from Queue import Queue
+from timeit import default_timer
+
+# how many events are collected before they are handed to the thread that writes them
+BATCH_SIZE = 2000
+
+
+# class to write a trace of the game in the Chrome trace event format, which can be opened in
+# chrome://tracing or Perfetto. Events are collected in a list and handed over in batches to a
+# thread that turns them into JSON and writes them, so the game loop never waits on the file
+class TraceWriter:
+
+    def __init__(self, filename):
+        self.file = open(filename, "w")
+        self.file.write("[\n")
+
+        # every event is timed from when the trace started
+        self.start = default_timer()
+        self.pid = os.getpid()
+        self.events = []
+
+        # how many times each of the functions being counted was called since the counts were last taken
+        self.calls = {}
+
+        self.queue = Queue()
+        self.thread = threading.Thread(target=self.write_batches)
+        self.thread.daemon = True
+        self.thread.start()
+
+    # returns the passed in time (from default_timer) in microseconds since the trace started
+    def get_timestamp(self, seconds):
+        return int((seconds - self.start) * 1000000)
+
+    # records a span with the passed in name that started and ended at the passed in times (from default_timer)
+    def add_span(self, name, category, start, end):
+        self.events.append({"name": name, "cat": category, "ph": "X", "pid": self.pid, "tid": 0,
+                            "ts": self.get_timestamp(start), "dur": self.get_timestamp(end) - self.get_timestamp(start)})
+        if len(self.events) >= BATCH_SIZE:
+            self.flush()
+
+    # records the passed in values (a dict of names to numbers) on the counter track with the passed in name
+    def add_counter(self, name, values):
+        self.events.append({"name": name, "ph": "C", "pid": self.pid, "tid": 0,
+                            "ts": self.get_timestamp(default_timer()), "args": values})
+        if len(self.events) >= BATCH_SIZE:
+            self.flush()
+
+    # returns the passed in function wrapped so that every call to it is recorded as a span
+    def wrap(self, name, category, function):
+        def traced(*args, **kwargs):
+            start = default_timer()
+            result = function(*args, **kwargs)
+            self.add_span(name, category, start, default_timer())
+            return result
+        return traced
+
+    # returns the passed in function wrapped so that the calls to it are counted under the passed in name
+    def count(self, name, function):
+        self.calls[name] = 0
+
+        def counted(*args, **kwargs):
+            self.calls[name] += 1
+            return function(*args, **kwargs)
+        return counted
+
+    # returns how many times each counted function was called since the last time and starts counting again
+    def take_calls(self):
+        calls = self.calls
+        self.calls = dict((name, 0) for name in calls)
+        return calls
+
+    # hands the collected events over to the writing thread
+    def flush(self):
+        if self.events:
+            self.queue.put(self.events)
+            self.events = []
+
+    # writes the batches of events as they come in, runs on its own thread until it gets None
+    def write_batches(self):
+        first = True
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                break
+            for event in batch:
+                if not first:
+                    self.file.write(",\n")
+                self.file.write(json.dumps(event))
+                first = False
+
+    # writes the remaining events and finishes the file
+    def close(self):
+        self.flush()
+        self.queue.put(None)
+        self.thread.join()
+        self.file.write("\n]\n")
+        self.file.close()
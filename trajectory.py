@@ -0,0 +1,88 @@
+import math
+
+
+# calculates the displacement for a unit that is jumping
+def jump(time, max_jump):
+    parabola_shift = int(math.sqrt(max_jump))
+    return (-2 * ((time - parabola_shift) * (time - parabola_shift))) + (2 * max_jump)
+
+
+# calculates the displacement for a unit that is in free fall
+def free_fall(time):
+    return -3 * time * time
+
+
+# calculates the x displacement for a unit that is knocked back
+def knock_back_x(time, constant):
+    return math.sqrt(time) + constant
+
+
+# calculates the y displacement for a unit that is knocked back
+def knock_back_y(time, constant):
+    return (-1 * (time - constant) * (time - constant)) + (constant * constant)
+
+
+# the functions of the tick that every kind of trajectory follows, the rest of
+# their arguments are the parameters that a table is built for
+PROFILES = {
+    "jump": jump,
+    "free fall": free_fall,
+    "knock back x": knock_back_x,
+    "knock back y": knock_back_y
+}
+
+
+# class to represent the displacements of one trajectory for every tick, they are
+# calculated once and then looked up, the table grows if a tick past the end is needed
+class TrajectoryTable:
+
+    def __init__(self, function, parameters, length):
+        self.function = function
+        self.parameters = parameters
+        self.values = []
+        self.extend(length)
+
+    # calculates the displacements up to (but not including) the passed in tick
+    def extend(self, length):
+        for time in range(len(self.values), length):
+            self.values.append(self.function(time, *self.parameters))
+
+    # returns the displacement at the passed in tick
+    def get(self, time):
+        if time >= len(self.values):
+            self.extend(max(time + 1, len(self.values) * 2))
+        return self.values[time]
+
+
+# class to hold a table for every trajectory and set of parameters that the game has used, a
+# profile with new parameters (like a unit that jumps higher) gets its own table the first time
+class TrajectoryCache:
+
+    def __init__(self, length, profiles=PROFILES):
+        # how many ticks a new table starts with
+        self.length = length
+        self.profiles = dict(profiles)
+
+        # maps the name of a profile and its parameters to its table
+        self.tables = {}
+
+    # adds a trajectory that is looked up by the passed in name, the function takes
+    # the tick followed by the parameters and returns the displacement at that tick
+    def add_profile(self, name, function):
+        self.profiles[name] = function
+
+    # returns the table for the profile with the passed in name and parameters, building it if it doesn't exist
+    def get_table(self, name, *parameters):
+        key = (name,) + parameters
+        table = self.tables.get(key)
+        if table is None:
+            table = TrajectoryTable(self.profiles[name], parameters, self.length)
+            self.tables[key] = table
+        return table
+
+    # returns the displacement at the passed in tick of the profile with the passed in name and parameters
+    def look_up(self, time, name, *parameters):
+        table = self.tables.get((name,) + parameters)
+        if table is None:
+            table = self.get_table(name, *parameters)
+        return table.get(time)
@@ -0,0 +1,393 @@
+import pygame
+from spatial import UnitGrid
+
+# numpy is only needed once a unit store is made, so the game can import this module without it
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# the names that the direction, knock_dir and y_dir of a unit can have, the
+# store keeps every name as its index in this list
+NAMES = [None, "left", "right", "up", "down"]
+NONE, LEFT, RIGHT, UP, DOWN = range(len(NAMES))
+CODES = dict((name, code) for code, name in enumerate(NAMES))
+
+# the arrays that the state of the units is kept in, with the type and the shape (after the slot) of each one
+FIELDS = {
+    "posn": ("float64", (2,)),
+    "last_posn": ("float64", (2,)),
+    "rect": ("int64", (2,)),
+    "width": ("int64", ()),
+    "height": ("int64", ()),
+    "max_jump": ("int64", ()),
+    "batched": ("bool", ()),
+    "HP": ("int64", ()),
+    "gravity_time": ("int64", ()),
+    "knock_back_time": ("int64", ()),
+    "y_base": ("float64", ()),
+    "x_base": ("float64", ()),
+    "free_fall": ("bool", ()),
+    "jumping": ("bool", ()),
+    "knock_back_blocked": ("bool", ()),
+    "motion": ("bool", ()),
+    "direction": ("int8", ()),
+    "knock_dir": ("int8", ()),
+    "y_dir": ("int8", ())
+}
+
+
+# class to hold the state of the units that gravity acts on (the player and the enemies) in numpy arrays
+# instead of in each unit, so that the batched physics engine and the enemies can update all of them
+# at once. A unit is referred to by its slot like a platform is by its index in the platform store, the
+# units themselves only read and write their slot. A slot is given back when its enemy is thrown away
+# instead of going back into the enemy pool, and the arrays are copied into bigger ones when they run out
+class UnitStore:
+
+    def __init__(self, capacity):
+        self.capacity = 0
+        self.count = 0
+
+        # the unit that every slot belongs to
+        self.units = numpy.empty(0, dtype=object)
+        for name, (dtype, shape) in FIELDS.items():
+            setattr(self, name, numpy.zeros((0,) + shape, dtype=dtype))
+        self.grow(max(capacity, 1))
+
+        # the slots that were given back and can be given out again
+        self.free_slots = []
+
+        # maps the id of a group's list of units to the list, its length and the slots of the units in it
+        self.slot_lists = {}
+
+    # copies every array into one that has room for the passed in amount of units, a unit's posn
+    # and last_posn must not be held onto while a slot is given out since they are views of the arrays
+    def grow(self, capacity):
+        units = numpy.empty(capacity, dtype=object)
+        units[:self.capacity] = self.units
+        self.units = units
+        for name, (dtype, shape) in FIELDS.items():
+            array = numpy.zeros((capacity,) + shape, dtype=dtype)
+            array[:self.capacity] = getattr(self, name)
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    # gives the passed in unit a slot and returns it, batched is False if the unit has to be moved one
+    # at a time by the physics engine (like the player, which scrolls the screen instead of moving)
+    def allocate(self, unit, batched):
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            if self.count == self.capacity:
+                self.grow(self.capacity * 2)
+            slot = self.count
+            self.count += 1
+        self.units[slot] = unit
+        self.width[slot] = unit.WIDTH
+        self.height[slot] = unit.HEIGHT
+        self.max_jump[slot] = unit.max_jump
+        self.batched[slot] = batched
+        return slot
+
+    # gives back the passed in slot once its unit is no longer used
+    def release(self, slot):
+        self.units[slot] = None
+        self.free_slots.append(slot)
+
+    # returns the slots of the passed in list of units (a group's list) as an array, the slots are kept
+    # for every list since a group's list is only ever appended to until the group replaces it
+    def get_slots(self, units):
+        cached = self.slot_lists.get(id(units))
+        if cached is not None and cached[0] is units and cached[1] == len(units):
+            return cached[2]
+        slots = numpy.fromiter((unit.slot for unit in units), numpy.int64, len(units))
+
+        # the lists that groups have replaced are forgotten every now and then
+        if len(self.slot_lists) > 16:
+            self.slot_lists = {}
+        self.slot_lists[id(units)] = (units, len(units), slots)
+        return slots
+
+    # moves the rects of the units in the passed in slots to their posn, a rect is cut down
+    # to whole pixels the same way as when it is moved with rect.topleft = posn
+    def update_rects(self, slots):
+        self.rect[slots] = numpy.trunc(self.posn[slots])
+
+    # remembers where every one of the passed in units is at the start of a tick
+    def remember_positions(self, units):
+        slots = self.get_slots(units)
+        self.last_posn[slots] = self.posn[slots]
+
+    # returns the span from the left to the right side (cut down to whole pixels) of the passed in units,
+    # with the spans that are closer than gap to each other merged. The level streamer pads every span
+    # on both sides, so merging spans that are closer than twice the padding needs the same chunks
+    def get_spans(self, units, gap):
+        slots = self.get_slots(units)
+        if len(slots) == 0:
+            return []
+        lefts = numpy.trunc(self.posn[slots, 0])
+        rights = numpy.trunc(self.posn[slots, 0] + self.width[slots])
+        order = numpy.argsort(lefts, kind="mergesort")
+        lefts = lefts[order]
+        rights = numpy.maximum.accumulate(rights[order])
+
+        # a new span starts wherever a unit starts further than gap past every unit before it
+        starts = numpy.flatnonzero(numpy.concatenate(([True], lefts[1:] > rights[:-1] + gap)))
+        ends = numpy.append(starts[1:], len(lefts)) - 1
+        return zip(lefts[starts].astype(int).tolist(), rights[ends].astype(int).tolist())
+
+    # returns True for every one of the passed in slots whose unit's rect collides with the passed in rect
+    def collides(self, slots, rect):
+        x = self.rect[slots, 0]
+        y = self.rect[slots, 1]
+        return (rect.left < x + self.width[slots]) & (x < rect.right) \
+            & (rect.top < y + self.height[slots]) & (y < rect.bottom)
+
+    # returns the passed in units whose rect collides with the passed in rect, in the same order
+    def colliding(self, units, rect):
+        slots = self.get_slots(units)
+        return self.units[slots[self.collides(slots, rect)]].tolist()
+
+
+# returns a property that reads and writes the passed in field of the unit's slot in its store
+def field_property(name):
+    def get(self):
+        return getattr(self.store, name).item(self.slot)
+
+    def set(self, value):
+        getattr(self.store, name)[self.slot] = value
+    return property(get, set)
+
+
+# returns a property that reads and writes the passed in field of the unit's slot in its store as a name from NAMES
+def name_property(name):
+    def get(self):
+        return NAMES[getattr(self.store, name).item(self.slot)]
+
+    def set(self, value):
+        getattr(self.store, name)[self.slot] = CODES[value]
+    return property(get, set)
+
+
+# returns a property for a position of the unit, the position is a view of the unit's row in the
+# store's array so changing one of its coordinates changes the store
+def posn_property(name):
+    def get(self):
+        return getattr(self.store, name)[self.slot]
+
+    def set(self, value):
+        getattr(self.store, name)[self.slot] = value
+    return property(get, set)
+
+
+# class that is mixed into a unit so that the state that the physics engine and the enemies use is kept
+# in its slot of a unit store instead of in the unit, the class that it is mixed into has to have the
+# store and slot attributes. The rest of the unit's attributes (like its color) stay in the unit
+class ArrayUnit(object):
+
+    __slots__ = ()
+
+    posn = posn_property("posn")
+    last_posn = posn_property("last_posn")
+    HP = field_property("HP")
+    gravity_time = field_property("gravity_time")
+    knock_back_time = field_property("knock_back_time")
+    y_base = field_property("y_base")
+    x_base = field_property("x_base")
+    free_fall = field_property("free_fall")
+    jumping = field_property("jumping")
+    knock_back_blocked = field_property("knock_back_blocked")
+    motion = field_property("motion")
+    direction = name_property("direction")
+    knock_dir = name_property("knock_dir")
+    y_dir = name_property("y_dir")
+
+    # the unit's rect is made from its slot every time it is asked for, so it has to be
+    # changed through update_rect instead of being moved in place
+    @property
+    def rect(self):
+        return pygame.Rect(self.store.rect.item(self.slot, 0), self.store.rect.item(self.slot, 1),
+                           self.WIDTH, self.HEIGHT)
+
+    @rect.setter
+    def rect(self, rect):
+        self.store.rect[self.slot] = rect.topleft
+
+    # moves the unit's rect to its posn
+    def update_rect(self):
+        self.store.update_rects(self.slot)
+
+
+# class to represent the numpy arrays of the cells of a platform grid, so that the platforms that a whole array
+# of rects collide with can be found at once. The arrays are made again whenever the grid has changed
+class PlatformGridArrays:
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.version = None
+
+        # the key of every cell in the grid in order, and where each cell's platforms start in platforms
+        self.keys = None
+        self.starts = None
+        self.platforms = None
+
+    # returns one number for the cell at the passed in column and row
+    def get_key(self, column, row):
+        return column * (2 ** 32) + (row + 2 ** 31)
+
+    # makes the arrays again from the grid's cells
+    def rebuild(self):
+        cells = sorted(self.grid.cells.items())
+        self.keys = numpy.array([self.get_key(column, row) for (column, row), cell in cells], dtype=numpy.int64)
+        lengths = numpy.array([len(cell) for key, cell in cells], dtype=numpy.int64)
+        self.starts = numpy.concatenate(([0], numpy.cumsum(lengths)))
+        self.platforms = numpy.array([index for key, cell in cells for index in cell], dtype=numpy.int64)
+        self.version = self.grid.version
+
+    # returns the pairs of rects (by their index in the passed in arrays) and platforms that collide, as an
+    # array of rect indexes and an array of platform indexes. The pairs are sorted by the rect and then by
+    # the order of the platforms in the level, so each rect's platforms are the ones PlatformGrid.collide finds
+    def collide_all(self, lefts, tops, widths, heights):
+        if self.version != self.grid.version:
+            self.rebuild()
+        rights = lefts + widths
+        bottoms = tops + heights
+        empty = numpy.zeros(0, dtype=numpy.int64)
+        if len(lefts) == 0 or len(self.keys) == 0:
+            return empty, empty
+
+        # the range of cells that each rect covers, the same as UniformGrid.get_cell_range
+        size = self.grid.cell_size
+        x0 = lefts // size
+        y0 = tops // size
+        columns = numpy.maximum(lefts, rights - 1) // size - x0 + 1
+        rows = numpy.maximum(tops, bottoms - 1) // size - y0 + 1
+
+        # one entry for every cell of every rect
+        counts = columns * rows
+        rects = numpy.repeat(numpy.arange(len(lefts)), counts)
+        steps = numpy.arange(len(rects)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        keys = self.get_key(x0[rects] + steps // rows[rects], y0[rects] + steps % rows[rects])
+
+        # look every cell up in the grid and keep the ones that have platforms in them
+        cells = numpy.minimum(numpy.searchsorted(self.keys, keys), len(self.keys) - 1)
+        found = self.keys[cells] == keys
+        rects = rects[found]
+        cells = cells[found]
+
+        # one pair for every platform in every cell that was found
+        counts = self.starts[cells + 1] - self.starts[cells]
+        pair_rects = numpy.repeat(rects, counts)
+        steps = numpy.arange(len(pair_rects)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        pair_platforms = self.platforms[numpy.repeat(self.starts[cells], counts) + steps]
+
+        # keep the pairs that really collide, the same check as PlatformGrid.collide
+        store = self.grid.store
+        x = numpy.frombuffer(store.x, dtype=numpy.int32)[pair_platforms]
+        y = numpy.frombuffer(store.y, dtype=numpy.int32)[pair_platforms]
+        width = numpy.frombuffer(store.width, dtype=numpy.int32)[pair_platforms]
+        height = numpy.frombuffer(store.height, dtype=numpy.int32)[pair_platforms]
+        hits = (x < rights[pair_rects]) & (lefts[pair_rects] < x + width) \
+            & (y < bottoms[pair_rects]) & (tops[pair_rects] < y + height)
+        pair_rects = pair_rects[hits]
+        pair_platforms = pair_platforms[hits]
+
+        # sort the pairs and drop the platforms that were found in more than one of a rect's cells
+        order = numpy.frombuffer(store.order, dtype=numpy.int64)[pair_platforms]
+        sort = numpy.lexsort((order, pair_rects))
+        pair_rects = pair_rects[sort]
+        pair_platforms = pair_platforms[sort]
+        unique = numpy.ones(len(pair_rects), dtype=bool)
+        unique[1:] = (pair_rects[1:] != pair_rects[:-1]) | (pair_platforms[1:] != pair_platforms[:-1])
+        return pair_rects[unique], pair_platforms[unique]
+
+
+# class to represent a unit grid that is filled from the arrays of a unit store instead of one unit at a time, every
+# cell holds the positions of its units in the order they were added, so the units that a rect collides with are
+# checked at once and come back in the same order as from UnitGrid
+class ArrayUnitGrid(UnitGrid):
+
+    def __init__(self, cell_size, store):
+        UnitGrid.__init__(self, cell_size)
+        self.store = store
+
+        # the units in the grid in the order they were added and their slots
+        self.units = []
+        self.slots = numpy.zeros(0, dtype=numpy.int64)
+
+    # adds the unit to every cell that it covers, this is only used for the units that spawn after the grid was filled
+    def insert(self, unit):
+        position = len(self.units)
+        self.units.append(unit)
+        self.slots = numpy.append(self.slots, unit.slot)
+        rect = unit.rect
+        x0, y0, x1, y1 = self.get_cell_range(rect.left, rect.top, rect.right, rect.bottom)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is None:
+                    self.cells[(cx, cy)] = numpy.array([position], dtype=numpy.int64)
+                else:
+                    self.cells[(cx, cy)] = numpy.append(cell, position)
+
+    # returns the units that collide with the passed in rect in the order they were added
+    def collide(self, rect):
+        x0, y0, x1, y1 = self.get_cell_range(rect.left, rect.top, rect.right, rect.bottom)
+        found = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is not None:
+                    found.append(cell)
+        if len(found) == 0:
+            return []
+
+        # a unit that covers more than one of the cells is only checked once
+        if len(found) == 1:
+            positions = found[0]
+        else:
+            positions = numpy.unique(numpy.concatenate(found))
+        positions = positions[self.store.collides(self.slots[positions], rect)]
+        return [self.units[position] for position in positions.tolist()]
+
+    # removes every unit from the grid
+    def clear(self):
+        UnitGrid.clear(self)
+        self.units = []
+        self.slots = numpy.zeros(0, dtype=numpy.int64)
+
+    # empties the grid and adds every one of the passed in units in order
+    def fill(self, units):
+        self.clear()
+        if len(units) == 0:
+            return
+        store = self.store
+        slots = store.get_slots(units)
+        size = self.cell_size
+        lefts = store.rect[slots, 0]
+        tops = store.rect[slots, 1]
+        x0 = lefts // size
+        y0 = tops // size
+        columns = numpy.maximum(lefts, lefts + store.width[slots] - 1) // size - x0 + 1
+        rows = numpy.maximum(tops, tops + store.height[slots] - 1) // size - y0 + 1
+
+        # one entry for every cell of every unit, sorted by cell with the units of a cell kept in order
+        counts = columns * rows
+        entries = numpy.repeat(numpy.arange(len(slots)), counts)
+        steps = numpy.arange(len(entries)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        cell_x = x0[entries] + steps // rows[entries]
+        cell_y = y0[entries] + steps % rows[entries]
+        sort = numpy.lexsort((entries, cell_y, cell_x))
+        cell_x = cell_x[sort]
+        cell_y = cell_y[sort]
+        entries = entries[sort]
+
+        # split the entries into their cells
+        starts = numpy.flatnonzero(numpy.concatenate(([True], (cell_x[1:] != cell_x[:-1])
+                                                       | (cell_y[1:] != cell_y[:-1]))))
+        ends = numpy.append(starts[1:], len(entries))
+        for start, end, cell in zip(starts.tolist(), ends.tolist(), zip(cell_x[starts].tolist(),
+                                                                         cell_y[starts].tolist())):
+            self.cells[cell] = entries[start:end]
+        self.units = list(units)
+        self.slots = slots